@@ -0,0 +1,78 @@
+''' Compares the per message cost of copying to the clipboard with a new Tk window each time
+    against the persistent Clipboard. Requires tkinter and a display.
+
+    With --keys, also compares typing messages of several lengths against pasting them, with
+    the configured key delays. This sends real keystrokes, so focus a scratch text editor first.
+
+    python benchmarks/clipboard.py [message_count] [--keys]
+'''
+import argparse
+
+from common import measure, print_result
+
+from utils.clipboard import Clipboard, TclError, copy_to_clipboard_once, is_clipboard_available
+
+MESSAGE = '/tell Soandso Cloak of Flames ; 25 ; Soandso gratss | Jboots ; 10 ; Fippy gratss'
+# e.g. /sit, /target Soandso and a short tell
+TYPED_LENGTHS = (4, 8, 16, 32)
+
+
+def _copy_once(count):
+    for i in range(count):
+        copy_to_clipboard_once(f'{MESSAGE} {i}')
+
+
+def _copy_persistent(clipboard, count):
+    for i in range(count):
+        clipboard.copy(f'{MESSAGE} {i}')
+
+
+def _send_repeatedly(send, text, count):
+    for _ in range(count):
+        send(text)
+
+
+def _compare_typed_and_pasted(count):
+    # Imported here as it needs pynput, which the copy comparison doesn't
+    from utils import output
+
+    print(f'{"length":<10} {"typed":>12} {"pasted":>12}')
+    for length in TYPED_LENGTHS:
+        text = MESSAGE[:length]
+        typed = measure(_send_repeatedly, output._type_text, text, count, repeat=1)
+        pasted = measure(_send_repeatedly, output._paste_text, text, count, repeat=1)
+        print(f'{length:<10} {typed / count * 1000:>9,.1f} ms {pasted / count * 1000:>9,.1f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks copying and pasting chat messages.')
+    parser.add_argument('count', type=int, nargs='?', default=200)
+    parser.add_argument('--keys', action='store_true', help='Also compare typing messages against pasting them')
+    args = parser.parse_args()
+    count = args.count
+
+    if not is_clipboard_available():
+        print('tkinter is not installed, there is nothing to compare.')
+        return
+
+    clipboard = Clipboard()
+    try:
+        once = measure(_copy_once, count)
+        persistent = measure(_copy_persistent, clipboard, count)
+    except TclError as e:
+        print(f'Tk could not be started, is there a display? {e}')
+        return
+    finally:
+        clipboard.close()
+
+    print_result('new Tk window per message', count, once, 'messages')
+    print_result('persistent clipboard', count, persistent, 'messages')
+    print(f'{"per message":<40} {once / count * 1000:>11,.2f} ms -> {persistent / count * 1000:,.2f} ms')
+
+    if args.keys:
+        # Each message sends keystrokes with human-like delays, so far fewer are needed
+        _compare_typed_and_pasted(max(1, count // 20))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+import os
+import sys
+import time
+
+# Benchmarks are ran from the project root (so config.yaml resolves) but
+# import the bot's modules the same way main.py does
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'eq_bot'))
+
+SAMPLE_LINES = [
+    "[Mon Oct 17 20:15:01 2022] Soandso tells you, '#bid Cloak of Flames : 25'\n",
+    "[Mon Oct 17 20:15:01 2022] You tell soandso, 'Incoming'\n",
+    "[Mon Oct 17 20:15:02 2022] Soandso tells the guild, 'anyone selling a bone chip?'\n",
+    "[Mon Oct 17 20:15:02 2022] Soandso tells General:3, 'LFG'\n",
+    "[Mon Oct 17 20:15:02 2022] Soandso tells the group, 'inc'\n",
+    "[Mon Oct 17 20:15:03 2022] Soandso auctions, 'WTS Cloak of Flames'\n",
+    "[Mon Oct 17 20:15:03 2022] Soandso says out of character, 'train to zone'\n",
+    "[Mon Oct 17 20:15:03 2022] Soandso shouts, 'help'\n",
+    "[Mon Oct 17 20:15:04 2022] Soandso says, 'Hail, Guard Hanlon'\n",
+    "[Mon Oct 17 20:15:04 2022] Soandso is the rank of officer in Fanodrel.\n",
+    "[Mon Oct 17 20:15:04 2022] You slash a sand giant for 45 points of damage.\n",
+    "[Mon Oct 17 20:15:05 2022] A sand giant hits YOU for 112 points of damage.\n",
+    "[Mon Oct 17 20:15:05 2022] Soandso hits a sand giant for 38 points of damage.\n",
+    "[Mon Oct 17 20:15:05 2022] A sand giant tries to hit Soandso, but misses!\n",
+    "[Mon Oct 17 20:15:06 2022] You have been healed for 450 points.\n",
+    "[Mon Oct 17 20:15:06 2022] Your target has been hit by a non-melee for 300 points of damage.\n",
+]
+
+
+def build_lines(count: int):
+    return [SAMPLE_LINES[i % len(SAMPLE_LINES)] for i in range(count)]
+
+
+def measure(fn, *args, repeat: int = 3):
+    ''' Returns the best wall clock time of calling fn(*args) repeat times '''
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def print_result(name: str, count: int, elapsed: float, unit: str = 'lines'):
+    print(f'{name:<40} {count / elapsed:>14,.0f} {unit}/sec')
@@ -0,0 +1,131 @@
+''' Compares the keyed dump differential against the original linear search, on synthetic dumps.
+
+    python benchmarks/dump_analyzer.py [--sizes 1000,5000,20000] [--legacy-max 5000]
+
+    The original is quadratic, so it is only measured up to --legacy-max members.
+'''
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from common import measure
+
+from game.guild.entities.guild_dump import GuildDump
+from game.guild.entities.guild_member import GuildMember
+from game.guild.entities.guild_dump_differential import GuildDumpDifferential
+from game.guild.dump_analyzer import build_differential, build_differentials, DAYS_UNTIL_INACTIVE
+
+CLASSES = ['Cleric', 'Warrior', 'Enchanter', 'Necromancer', 'Shaman', 'Rogue', 'Bard', 'Druid']
+RANKS = ['Member', 'Officer', 'Raider', 'Leader']
+ZONES = ['The Plane of Fear', 'East Commonlands', 'Western Wastes', 'North Freeport']
+
+
+# Reference implementation of the differential prior to keyed lookups
+def _legacy_build_differential(from_dump, to_dump):
+    new_members = []
+    left_members = []
+    inactive_members = []
+    logged_on = []
+    logged_off = []
+
+    current_time = datetime.now()
+
+    for member in to_dump.members:
+        from_member = next((x for x in from_dump.members if x.name == member.name), None)
+        if not from_member:
+            new_members.append(member)
+        else:
+            if not from_member.is_online and member.is_online:
+                logged_on.append(member)
+            if from_member.is_online and not member.is_online:
+                logged_off.append(member)
+            if (current_time - member.last_seen_on).days > DAYS_UNTIL_INACTIVE and not\
+                (current_time - from_member.last_seen_on).days > DAYS_UNTIL_INACTIVE:
+                inactive_members.append(member)
+
+    for member in from_dump.members:
+        to_member = next((x for x in to_dump.members if x.name == member.name), None)
+        if not to_member:
+            left_members.append(member)
+
+    return GuildDumpDifferential(
+        new_members=new_members,
+        left_members=left_members,
+        inactive_members=inactive_members,
+        logged_on=logged_on,
+        logged_off=logged_off,
+        delta_time=to_dump.taken_at - from_dump.taken_at)
+
+
+def _build_member(rng, name, taken_at):
+    zone = rng.choice(ZONES) if rng.random() < .2 else ''
+    return GuildMember(
+        name=name,
+        class_type=rng.choice(CLASSES),
+        level=rng.randint(1, 60),
+        last_seen_by_bot=taken_at,
+        last_seen_on=taken_at - timedelta(days=rng.randint(0, 2 * DAYS_UNTIL_INACTIVE)),
+        rank=rng.choice(RANKS),
+        is_alt=rng.random() < .3,
+        zone=zone,
+        public_note='',
+        is_online=len(zone) > 0)
+
+
+def build_dumps(size: int, count: int = 2, seed: int = 0):
+    ''' Returns consecutive dumps of roughly size members, with members joining, leaving and logging on/off '''
+    rng = random.Random(seed)
+    taken_at = datetime.now() - timedelta(minutes=5 * count)
+    members = [_build_member(rng, f'Member{i:06d}', taken_at) for i in range(size)]
+    next_id = size
+    dumps = [GuildDump(members=members, taken_at=taken_at)]
+
+    for _ in range(1, count):
+        taken_at += timedelta(minutes=5)
+        members = [m for m in members if rng.random() >= .02]
+        for _ in range(size // 50):
+            members.append(_build_member(rng, f'Member{next_id:06d}', taken_at))
+            next_id += 1
+        members = [
+            _build_member(rng, m.name, taken_at) if rng.random() < .1 else m
+            for m in members
+        ]
+        # Shuffled so that members don't keep their position between dumps
+        rng.shuffle(members)
+        dumps.append(GuildDump(members=members, taken_at=taken_at))
+    return dumps
+
+
+def _summarize(differential):
+    return tuple(
+        sorted(member.name for member in members)
+        for members in (differential.new_members, differential.left_members, differential.inactive_members,
+            differential.logged_on, differential.logged_off))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks the guild dump differential.')
+    parser.add_argument('--sizes', default='1000,5000,20000')
+    parser.add_argument('--legacy-max', type=int, default=5000)
+    parser.add_argument('--history', type=int, default=50, help='Dumps to diff in bulk per size')
+    args = parser.parse_args()
+
+    for size in [int(size) for size in args.sizes.split(',')]:
+        from_dump, to_dump = build_dumps(size)
+        print(f'[{size:,} members]')
+
+        keyed = measure(build_differential, from_dump, to_dump)
+        print(f'  keyed           {keyed * 1000:>12,.2f} ms')
+
+        if size <= args.legacy_max:
+            legacy = measure(_legacy_build_differential, from_dump, to_dump, repeat=1)
+            same = _summarize(build_differential(from_dump, to_dump)) == _summarize(_legacy_build_differential(from_dump, to_dump))
+            print(f'  original        {legacy * 1000:>12,.2f} ms ({legacy / keyed:,.0f}x slower, same result: {same})')
+
+        history = build_dumps(size, args.history)
+        bulk = measure(build_differentials, history, repeat=1)
+        print(f'  bulk history    {bulk / (args.history - 1) * 1000:>12,.2f} ms per interval ({args.history} dumps)')
+
+
+if __name__ == '__main__':
+    main()
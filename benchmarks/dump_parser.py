@@ -0,0 +1,116 @@
+''' Compares the fixed-format guild dump parser against the original csv/dateutil parser.
+
+    python benchmarks/dump_parser.py [--members 20000]
+'''
+import argparse
+import csv
+import os
+import random
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+
+from dateutil.parser import parse
+
+from common import measure, print_result
+
+from game.guild.entities.guild_dump import GuildDump
+from game.guild.entities.guild_member import GuildMember
+from game.guild import dump_parser
+from game.guild.dump_parser import parse_dump_file, iter_dump_file, LAST_SEEN_FORMAT
+
+CLASSES = ['Cleric', 'Warrior', 'Enchanter', 'Necromancer', 'Shaman', 'Rogue', 'Bard', 'Druid']
+RANKS = ['Member', 'Officer', 'Raider', 'Leader']
+ZONES = ['The Plane of Fear', 'East Commonlands', 'Western Wastes', 'North Freeport']
+
+
+# Reference implementation of the parser prior to the fixed-format parse
+def _legacy_parse_guild_member(dump_time, member_arr):
+    zone = member_arr[6]
+    return GuildMember(
+        name=member_arr[0],
+        level=int(member_arr[1]),
+        class_type=member_arr[2],
+        rank=member_arr[3],
+        is_alt=member_arr[4] == 'A',
+        last_seen_on=parse(member_arr[5]),
+        zone=zone,
+        public_note=member_arr[7],
+        last_seen_by_bot=dump_time,
+        is_online=zone and len(zone) > 0
+    )
+
+
+def _legacy_parse_dump_file(dump_time, filepath):
+    member_entities = []
+    with open(filepath, newline='') as guild_dump:
+        members = csv.reader(guild_dump, delimiter='\t')
+        for member in members:
+            member_entities.append(_legacy_parse_guild_member(dump_time, member))
+
+    return GuildDump(members=member_entities, taken_at=dump_time)
+
+
+def write_dump(path: str, count: int, seed: int = 0):
+    ''' Writes a dump in the /outputfile guild layout, with members seen over the last 90 days '''
+    rng = random.Random(seed)
+    today = datetime.now()
+    with open(path, 'w', newline='') as dump:
+        for i in range(count):
+            zone = rng.choice(ZONES) if rng.random() < .2 else ''
+            last_seen = (today - timedelta(days=rng.randint(0, 90))).strftime(LAST_SEEN_FORMAT)
+            dump.write('\t'.join([
+                f'Member{i:06d}', str(rng.randint(1, 60)), rng.choice(CLASSES), rng.choice(RANKS),
+                'A' if rng.random() < .3 else '', last_seen, zone, 'main' if rng.random() < .5 else '',
+                '', 'Off', 'off', '0', '0', '0',
+            ]) + '\r\n')
+
+
+def _consume(filepath):
+    # Streams the dump without keeping the members, as a bulk history scan would
+    for _ in iter_dump_file(datetime.now(), filepath):
+        pass
+
+
+def _traced_peak(fn, *args):
+    dump_parser._parse_last_seen.cache_clear()
+    tracemalloc.start()
+    result = fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks the guild dump parser.')
+    parser.add_argument('--members', type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'Guild-Dump.txt')
+        write_dump(path, args.members)
+        dump_time = datetime.now()
+
+        legacy = measure(_legacy_parse_dump_file, dump_time, path, repeat=1)
+        dump_parser._parse_last_seen.cache_clear()
+        fixed = measure(parse_dump_file, dump_time, path)
+        streaming = measure(_consume, path)
+
+        same = [vars(m) for m in _legacy_parse_dump_file(dump_time, path).members] == \
+            [{ **vars(m), 'is_online': m.is_online or m.zone } for m in parse_dump_file(dump_time, path).members]
+
+        print_result('original (csv + dateutil)', args.members, legacy, 'members')
+        print_result('fixed format', args.members, fixed, 'members')
+        print_result('fixed format, streamed', args.members, streaming, 'members')
+        print(f'{"speedup":<40} {legacy / fixed:>14,.1f}x (same members: {same})')
+
+        legacy_peak = _traced_peak(_legacy_parse_dump_file, dump_time, path)
+        fixed_peak = _traced_peak(parse_dump_file, dump_time, path)
+        streaming_peak = _traced_peak(_consume, path)
+        print(f'{"peak memory":<40} {legacy_peak / 1024 / 1024:>11,.1f} MiB original, '
+            f'{fixed_peak / 1024 / 1024:,.1f} MiB fixed, {streaming_peak / 1024 / 1024:,.1f} MiB streamed')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+''' Writes synthetic EverQuest logs, either all at once or appended live at a fixed rate.
+
+    python benchmarks/eqlog_generator.py <folder> [--name Soandso] [--server green]
+        [--lines 100000] [--rate 0] [--mix combat=85,tell=3,guild=4,channel=4,ooc=2,rank=1,say=1]
+
+    A rate of 0 writes every line immediately.
+'''
+import argparse
+import os
+import random
+import time
+from datetime import datetime
+from typing import Callable, Dict
+
+LOG_TIMESTAMP_FORMAT = '[%a %b %d %H:%M:%S %Y]'
+
+NAMES = ['Soandso', 'Fippy', 'Bixie', 'Tunare', 'Mystik', 'Grimlock', 'Aradune', 'Firiona', 'Brell', 'Vox']
+MOBS = ['a sand giant', 'a gnoll pup', 'Lord Nagafen', 'a frost giant scout', 'an undead knight']
+CHANNELS = ['General', 'Auction', 'Raid', 'Guildies']
+ITEMS = ['Cloak of Flames', 'Fungus Covered Scale Tunic', 'Jboots', 'Shiny Brass Idol']
+
+DEFAULT_MIX = {
+    'combat': 85,
+    'tell': 3,
+    'guild': 4,
+    'channel': 4,
+    'ooc': 2,
+    'rank': 1,
+    'say': 1,
+}
+
+
+def _combat(rng):
+    return rng.choice([
+        lambda: f'You slash {rng.choice(MOBS)} for {rng.randint(1, 200)} points of damage.',
+        lambda: f'{rng.choice(MOBS).capitalize()} hits YOU for {rng.randint(1, 300)} points of damage.',
+        lambda: f'{rng.choice(NAMES)} hits {rng.choice(MOBS)} for {rng.randint(1, 200)} points of damage.',
+        lambda: f'{rng.choice(MOBS).capitalize()} tries to hit {rng.choice(NAMES)}, but misses!',
+        lambda: f'You have been healed for {rng.randint(50, 1500)} points.',
+    ])()
+
+
+def _tell(rng, sequence):
+    # Tells carry a sequence number so that their latency can be measured
+    return f"{rng.choice(NAMES)} tells you, '#bid {rng.choice(ITEMS)} : {rng.randint(1, 100)} seq:{sequence}'"
+
+
+MESSAGE_BUILDERS: Dict[str, Callable] = {
+    'combat': lambda rng, sequence: _combat(rng),
+    'tell': _tell,
+    'guild': lambda rng, sequence: f"{rng.choice(NAMES)} tells the guild, 'anyone have a port?'",
+    'channel': lambda rng, sequence: f"{rng.choice(NAMES)} tells {rng.choice(CHANNELS)}:{rng.randint(1, 9)}, 'LFG'",
+    'ooc': lambda rng, sequence: f"{rng.choice(NAMES)} says out of character, 'train to zone!'",
+    'rank': lambda rng, sequence: f'{rng.choice(NAMES)} is the rank of member in Fanodrel.',
+    'say': lambda rng, sequence: f"{rng.choice(NAMES)} says, 'Hail, {rng.choice(NAMES)}'",
+}
+
+
+def parse_mix(mix: str) -> Dict[str, int]:
+    ''' Parses a mix such as combat=90,tell=10 into weights by message kind '''
+    weights = {}
+    for part in filter(None, mix.split(',')):
+        kind, weight = part.split('=')
+        if kind not in MESSAGE_BUILDERS:
+            raise ValueError(f'Unknown message kind {kind}, expected one of {list(MESSAGE_BUILDERS)}')
+        weights[kind] = int(weight)
+    return weights
+
+
+class EqLogGenerator:
+    def __init__(self, path: str, mix: Dict[str, int] = None, seed: int = 0):
+        self.path = path
+        self._rng = random.Random(seed)
+        mix = mix or DEFAULT_MIX
+        self._kinds = list(mix.keys())
+        self._weights = list(mix.values())
+        self._sequence = 0
+        # Called with (sequence, write time) for each tell, just before it is written so that
+        # a reader tailing the log can't receive it first
+        self.on_tell_written = None
+
+    @staticmethod
+    def log_path(folder: str, name: str, server: str) -> str:
+        return os.path.join(folder, f'eqlog_{name}_{server.lower()}.txt')
+
+    def build_lines(self, count: int):
+        timestamp = datetime.now().strftime(LOG_TIMESTAMP_FORMAT)
+        lines = []
+        tells = []
+        for kind in self._rng.choices(self._kinds, self._weights, k=count):
+            if kind == 'tell':
+                tells.append(self._sequence)
+            lines.append(f'{timestamp} {MESSAGE_BUILDERS[kind](self._rng, self._sequence)}\n')
+            self._sequence += 1
+        return lines, tells
+
+    def write(self, count: int) -> None:
+        lines, tells = self.build_lines(count)
+        if self.on_tell_written:
+            written_at = time.perf_counter()
+            for sequence in tells:
+                self.on_tell_written(sequence, written_at)
+        with open(self.path, 'a') as log:
+            log.writelines(lines)
+
+    def write_live(self, count: int, rate: float, batches_per_second: int = 20) -> None:
+        ''' Appends count lines at roughly rate lines per second '''
+        batch_size = max(1, int(rate / batches_per_second))
+        interval = batch_size / rate
+        next_write = time.perf_counter()
+        written = 0
+        while written < count:
+            size = min(batch_size, count - written)
+            self.write(size)
+            written += size
+            next_write += interval
+            time.sleep(max(0, next_write - time.perf_counter()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Writes a synthetic EverQuest log.')
+    parser.add_argument('folder')
+    parser.add_argument('--name', default='Soandso')
+    parser.add_argument('--server', default='green')
+    parser.add_argument('--lines', type=int, default=100000)
+    parser.add_argument('--rate', type=float, default=0, help='Lines per second, 0 writes everything at once')
+    parser.add_argument('--mix', default='', help='e.g. combat=85,tell=3,guild=4,channel=4,ooc=2,rank=1,say=1')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    os.makedirs(args.folder, exist_ok=True)
+    generator = EqLogGenerator(
+        EqLogGenerator.log_path(args.folder, args.name, args.server),
+        parse_mix(args.mix) or None,
+        args.seed)
+
+    if args.rate > 0:
+        generator.write_live(args.lines, args.rate)
+    else:
+        generator.write(args.lines)
+    print(f'Wrote {args.lines:,} lines to {generator.path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+''' Compares CPU time and memory of eager LogMessage and LazyLogMessage creation.
+
+    python benchmarks/log_message.py [line_count]
+'''
+import sys
+import time
+import tracemalloc
+
+from common import build_lines, print_result
+
+from game.logging.entities.log_message import LogMessageType
+from game.logging.log_message_parser import create_log_message, create_lazy_log_message
+from utils.time import parse_log_timestamp
+
+
+def _create_all(create_fn, lines):
+    return [create_fn(line) for line in lines]
+
+
+def _observe_tells(messages):
+    # Mimic the bot, which only reads the fields of tells
+    for message in messages:
+        if message.message_type == LogMessageType.TELL_RECEIVE:
+            message.timestamp, message.from_character, message.inner_message
+
+
+def _profile(name, create_fn, lines):
+    parse_log_timestamp.cache_clear()
+    tracemalloc.start()
+    start = time.perf_counter()
+    messages = _create_all(create_fn, lines)
+    _observe_tells(messages)
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print_result(name, len(lines), elapsed)
+    print(f'{"":<40} {size / 1024 / 1024:>14,.1f} MiB retained')
+    return elapsed, size
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    # Make every line a distinct object, as they would be when read from a file
+    lines = [line[:-1] + '\n' for line in build_lines(count)]
+
+    eager_time, eager_size = _profile('LogMessage', create_log_message, lines)
+    lazy_time, lazy_size = _profile('LazyLogMessage', create_lazy_log_message, lines)
+
+    print(f'Saved per {count:,} lines: {eager_time - lazy_time:.3f} sec, {(eager_size - lazy_size) / 1024 / 1024:,.1f} MiB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+''' Compares the rule table classifier against the original split/if-elif parser.
+
+    python benchmarks/log_message_parser.py [line_count]
+'''
+import re
+import sys
+from datetime import datetime
+
+from common import build_lines, measure, print_result
+
+from game.logging.entities.log_message import LogMessage, LogMessageType
+from game.logging import log_message_parser
+from game.logging.log_message_parser import create_log_message, COMMUNICATION_MESSAGES
+
+
+# Reference implementation of the parser prior to the rule table
+def _legacy_parse_message_type(full_message, message_split):
+    if message_split[1] == 'tells':
+        if len(message_split[2].split(':')) > 1:
+            return LogMessageType.CHANNEL
+        elif message_split[2] == 'you,':
+            return LogMessageType.TELL_RECEIVE
+        elif message_split[2] == 'the':
+            if message_split[3] == 'group,':
+                return LogMessageType.GROUP
+            elif message_split[3] == 'guild,':
+                return LogMessageType.GUILD
+    elif message_split[1] == 'says':
+        if ' '.join(message_split[2:]).startswith('out of character,'):
+            return LogMessageType.OUT_OF_CHARACTER
+    elif message_split[1] == 'auctions,':
+        return LogMessageType.AUCTION
+    elif message_split[1] == 'shouts,':
+        return LogMessageType.SHOUT
+    elif message_split[1] == 'says,':
+        if len(message_split) == 3:
+            return LogMessageType.SAY
+    elif full_message.startswith('You tell'):
+        return LogMessageType.TELL_SEND
+    elif ' '.join(message_split[1:]).startswith('is the rank of'):
+        return LogMessageType.GUILD_STAT
+    return LogMessageType.UNKNOWN
+
+
+def _legacy_parse_message_to(message_split, message_type):
+    if message_type == LogMessageType.CHANNEL:
+        return message_split[2].split(':')[0]
+    elif message_type == LogMessageType.TELL_RECEIVE or message_type == LogMessageType.TELL_SEND:
+        return message_split[2].rstrip(',').capitalize()
+
+
+def _legacy_parse_inner_message(full_message):
+    result = re.search(", '(.*)'$", full_message)
+    if not result or len(result.groups()) == 0:
+        raise ValueError('Failed to parse inner message.')
+    return result.group(1)
+
+
+def legacy_create_log_message(raw_text):
+    full_message = raw_text[27:].rstrip('\n')
+    message_split = full_message.split(' ')
+    message_type = _legacy_parse_message_type(full_message, message_split)
+    is_communication_message = message_type in COMMUNICATION_MESSAGES
+
+    return LogMessage(
+        timestamp = datetime.strptime(raw_text[0:26], "[%a %b %d %H:%M:%S %Y]"),
+        from_character = message_split[0] if is_communication_message else None,
+        to = _legacy_parse_message_to(message_split, message_type),
+        inner_message = _legacy_parse_inner_message(full_message) if is_communication_message else None,
+        full_message = full_message,
+        message_type = message_type)
+
+
+def legacy_classify(full_message):
+    message_split = full_message.split(' ')
+    message_type = _legacy_parse_message_type(full_message, message_split)
+    is_communication_message = message_type in COMMUNICATION_MESSAGES
+    return (
+        message_type,
+        message_split[0] if is_communication_message else None,
+        _legacy_parse_message_to(message_split, message_type),
+        _legacy_parse_inner_message(full_message) if is_communication_message else None)
+
+
+def _parse_all(parse_fn, lines):
+    for line in lines:
+        parse_fn(line)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    lines = build_lines(count)
+
+    print_result('legacy split/if-elif parser', count, measure(_parse_all, legacy_create_log_message, lines))
+    print_result('rule table parser', count, measure(_parse_all, create_log_message, lines))
+
+    # Classification without timestamp decoding or LogMessage construction
+    full_messages = [line[27:].rstrip('\n') for line in lines]
+    print_result('legacy classification only', count, measure(_parse_all, legacy_classify, full_messages))
+    print_result('rule table classification only', count, measure(_parse_all, log_message_parser._classifier.classify, full_messages))
+
+
+if __name__ == '__main__':
+    main()
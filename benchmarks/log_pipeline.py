@@ -0,0 +1,132 @@
+''' Measures the log pipeline (tailing, parsing and observer dispatch) against synthetic logs.
+
+    python benchmarks/log_pipeline.py [--mode replay|live|both] [--lines 200000] [--rate 5000] [--mix ...]
+
+    replay: the whole log is written before the reader processes it
+    live: the log is appended at --rate lines per second while the reader thread tails it
+
+    Latency is measured from a tell being written to the log until its observer is called.
+'''
+import argparse
+import random
+import resource
+import tempfile
+import time
+import tracemalloc
+
+from common import measure
+
+from eqlog_generator import EqLogGenerator, parse_mix
+
+from game.entities.player import CurrentPlayer
+from game.logging import log_reader
+from game.logging.log_reader import EverQuestLogReader
+from game.logging.entities.log_message import LogMessageType
+
+# Only wait this long for every tell to be delivered
+DELIVERY_TIMEOUT = 30
+
+
+class _LatencyRecorder:
+    def __init__(self):
+        self.written_at = {}
+        self.latencies = []
+
+    def on_tell_written(self, sequence, written_at):
+        self.written_at[sequence] = written_at
+
+    def on_tell(self, message):
+        received_at = time.perf_counter()
+        sequence = int(message.inner_message.rsplit('seq:', 1)[1])
+        self.latencies.append(received_at - self.written_at[sequence])
+
+    def wait_for_delivery(self):
+        deadline = time.perf_counter() + DELIVERY_TIMEOUT
+        while len(self.latencies) < len(self.written_at) and time.perf_counter() < deadline:
+            time.sleep(.001)
+
+    def percentile(self, fraction):
+        if not self.latencies:
+            return float('nan')
+        ordered = sorted(self.latencies)
+        return ordered[int(fraction * (len(ordered) - 1))]
+
+
+def _build_reader(folder, mix):
+    # A unique player keeps runs from sharing a log or checkpoint
+    player = CurrentPlayer(name=f'Bench{random.randint(0, 10 ** 9)}', server='bench', guild=None)
+    reader = EverQuestLogReader(folder, player)
+
+    recorder = _LatencyRecorder()
+    reader.observe_messages(LogMessageType.TELL_RECEIVE, recorder.on_tell)
+
+    generator = EqLogGenerator(reader.get_player_log(), mix)
+    generator.on_tell_written = recorder.on_tell_written
+    return reader, generator, recorder
+
+
+def _print_report(mode, lines, elapsed, recorder, memory):
+    print(f'[{mode}]')
+    print(f'  throughput      {lines / elapsed:>14,.0f} lines/sec ({lines:,} lines in {elapsed:.2f} sec)')
+    print(f'  tells delivered {len(recorder.latencies):>14,} / {len(recorder.written_at):,}')
+    print(f'  latency p50     {recorder.percentile(.5) * 1000:>14,.2f} ms')
+    print(f'  latency p99     {recorder.percentile(.99) * 1000:>14,.2f} ms')
+    print(f'  memory          {memory}')
+
+
+def run_replay(folder, lines, mix):
+    reader, generator, recorder = _build_reader(folder, mix)
+    generator.write(lines)
+
+    def process():
+        reader.process_new_messages()
+        recorder.wait_for_delivery()
+
+    elapsed = measure(process, repeat=1)
+
+    # Measure memory in a separate pass, as tracing slows down the pipeline
+    reader, generator, _ = _build_reader(folder, mix)
+    generator.write(lines)
+    tracemalloc.start()
+    reader.process_new_messages()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    _print_report('replay', lines, elapsed, recorder, f'{peak / 1024 / 1024:>14,.1f} MiB peak traced')
+
+
+def run_live(folder, lines, rate, mix):
+    reader, generator, recorder = _build_reader(folder, mix)
+    max_rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    reader.start()
+    start = time.perf_counter()
+    generator.write_live(lines, rate)
+    recorder.wait_for_delivery()
+    elapsed = time.perf_counter() - start
+
+    max_rss_growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - max_rss_before
+    _print_report('live', lines, elapsed, recorder, f'{max_rss_growth / 1024:>14,.1f} MiB max RSS growth')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks the log reader pipeline.')
+    parser.add_argument('--mode', choices=['replay', 'live', 'both'], default='both')
+    parser.add_argument('--lines', type=int, default=200000)
+    parser.add_argument('--rate', type=float, default=5000, help='Lines per second appended in live mode')
+    parser.add_argument('--mix', default='', help='e.g. combat=85,tell=3,guild=4,channel=4,ooc=2,rank=1,say=1')
+    args = parser.parse_args()
+
+    # Benchmarks shouldn't leave checkpoints behind or resume from a previous run
+    log_reader.CHECKPOINT_ENABLED = False
+
+    mix = parse_mix(args.mix) or None
+    with tempfile.TemporaryDirectory() as folder:
+        if args.mode in ('replay', 'both'):
+            run_replay(folder, args.lines, mix)
+        if args.mode in ('live', 'both'):
+            run_live(folder, min(args.lines, int(args.rate * 20)), args.rate, mix)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,21 +1,177 @@
+import asyncio
+import time
 import traceback
 
-from queue import Queue
-from threading import Thread
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from enum import IntEnum
+from threading import Thread, Condition
+from typing import Dict, Hashable
 
-_queue = Queue()
+from utils.config import get_config
+from utils.metrics import counter, gauge, histogram, register_collector
 
 
-# Run this as a daemon so the thread will be cleaned up if the process is destroyed    
+class ActionPriority(IntEnum):
+    ''' Lower values are ran first '''
+    BIDDING = 0
+    BUFF = 1
+    HOUSEKEEPING = 2
+
+
+# Seconds an action may wait before it is ran ahead of higher priorities, so that it isn't starved
+STARVATION_LIMITS = {
+    ActionPriority.BIDDING: None,
+    ActionPriority.BUFF: get_config('general.action_queue.starvation_limit.buff', 120),
+    ActionPriority.HOUSEKEEPING: get_config('general.action_queue.starvation_limit.housekeeping', 300),
+}
+
+
+@dataclass
+class _QueuedAction:
+    action: object
+    # Category of the action, which metrics are recorded under
+    name: str
+    priority: ActionPriority
+    enqueued_at: float
+    deadline: float
+    key: Hashable = None
+    # Completed with the action's result, when the action is being awaited
+    future: Future = None
+
+
+@dataclass
+class ActionClassStats:
+    priority: ActionPriority
+    queued: int = 0
+    executed: int = 0
+    expired: int = 0
+    # Actions which replaced a pending action with the same key, rather than being queued
+    coalesced: int = 0
+    # Seconds actions spent waiting in the queue before running
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+    last_wait: float = 0.0
+
+    @property
+    def average_wait(self) -> float:
+        return self.total_wait / self.executed if self.executed else 0.0
+
+    def print(self):
+        print({ **vars(self), 'average_wait': self.average_wait })
+
+
+_queues = { priority: deque() for priority in ActionPriority }
+_stats = { priority: ActionClassStats(priority) for priority in ActionPriority }
+_pending_by_key = {}
+_condition = Condition()
+# The event loop and event which wake the driver, when the queue is ran by run_async
+_async_wakeup = None
+
+_wait_seconds = histogram('eq_bot_action_wait_seconds', 'Seconds actions waited in the queue before running', ('action',))
+_run_seconds = histogram('eq_bot_action_run_seconds', 'Seconds actions took to run', ('action',))
+_errors_total = counter('eq_bot_action_errors_total', 'Actions which raised an exception', ('action',))
+_coalesced_total = counter('eq_bot_action_coalesced_total', 'Actions which replaced a pending action with the same key', ('action',))
+_expired_total = counter('eq_bot_action_expired_total', 'Actions dropped for not starting before their deadline', ('action',))
+_queue_depth = gauge('eq_bot_action_queue_depth', 'Actions waiting to run', ('priority',))
+
+
+def _is_starved(priority: ActionPriority, now: float) -> bool:
+    limit = STARVATION_LIMITS[priority]
+    queue = _queues[priority]
+    return limit is not None and len(queue) > 0 and now - queue[0].enqueued_at >= limit
+
+
+def _next_action():
+    # Must be called while holding the condition
+    now = time.monotonic()
+    priority = next((p for p in ActionPriority if _is_starved(p, now)), None)
+    if priority is None:
+        priority = next(p for p in ActionPriority if _queues[p])
+
+    queued_action = _queues[priority].popleft()
+    if queued_action.key is not None:
+        del _pending_by_key[queued_action.key]
+    stats = _stats[priority]
+    stats.queued -= 1
+
+    if queued_action.deadline is not None and now > queued_action.deadline:
+        stats.expired += 1
+        _expired_total.inc(action=queued_action.name)
+        if queued_action.future:
+            queued_action.future.cancel()
+        print(f'Dropped a {priority.name} action ({queued_action.name}) which was not started before its deadline.')
+        return None
+
+    wait = now - queued_action.enqueued_at
+    stats.executed += 1
+    stats.total_wait += wait
+    stats.last_wait = wait
+    stats.max_wait = max(stats.max_wait, wait)
+    _wait_seconds.observe(wait, action=queued_action.name)
+    return queued_action
+
+
+def _run_action(queued_action: _QueuedAction) -> None:
+    start = time.monotonic()
+    try:
+        result = queued_action.action()
+        if queued_action.future:
+            queued_action.future.set_result(result)
+    except Exception as e:
+        _errors_total.inc(action=queued_action.name)
+        if queued_action.future:
+            # Raised to whoever is awaiting the action instead
+            queued_action.future.set_exception(e)
+        else:
+            print(f'Error occurred on Window thread while running {queued_action.name}.')
+            traceback.print_exc()
+    finally:
+        _run_seconds.observe(time.monotonic() - start, action=queued_action.name)
+
+
+def _notify():
+    # Must be called while holding the condition
+    _condition.notify()
+    if _async_wakeup:
+        loop, event = _async_wakeup
+        loop.call_soon_threadsafe(event.set)
+
+
+# Run this as a daemon so the thread will be cleaned up if the process is destroyed
 def _run() -> None:
     while True:
-        action = _queue.get(block=True)
+        with _condition:
+            while not any(_queues.values()):
+                _condition.wait()
+            queued_action = _next_action()
+
+        if queued_action:
+            _run_action(queued_action)
 
-        try:
-            action()
-        except Exception as e:
-            print(f'Error occurred on Window thread.')
-            traceback.print_exc()
+
+async def run_async() -> None:
+    ''' Drives the queue from an event loop instead of start(). Actions still run one at
+        a time, on a single worker thread, so that they can block without stalling the loop.
+    '''
+    global _async_wakeup
+    loop = asyncio.get_running_loop()
+    wakeup = asyncio.Event()
+    _async_wakeup = (loop, wakeup)
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='window')
+
+    while True:
+        # Cleared before checking the queue, so that an action enqueued in between isn't missed
+        wakeup.clear()
+        with _condition:
+            has_actions = any(_queues.values())
+            queued_action = _next_action() if has_actions else None
+
+        if not has_actions:
+            await wakeup.wait()
+        elif queued_action:
+            await loop.run_in_executor(executor, _run_action, queued_action)
 
 
 def start():
@@ -24,9 +180,72 @@ def start():
     Thread(target=_run, daemon=True).start()
 
 
-def enqueue_action(action):
+def _enqueue(action, priority: ActionPriority, timeout: float, name: str, key: Hashable, future: Future = None):
+    now = time.monotonic()
+    name = name or getattr(action, '__name__', type(action).__name__)
+    deadline = now + timeout if timeout is not None else None
+    with _condition:
+        pending_action = _pending_by_key.get(key) if key is not None else None
+        if pending_action:
+            if pending_action.future:
+                # Whoever awaited the replaced action won't get a result from it
+                pending_action.future.cancel()
+            pending_action.action = action
+            pending_action.name = name
+            pending_action.deadline = deadline
+            pending_action.future = future
+            _stats[pending_action.priority].coalesced += 1
+            _coalesced_total.inc(action=name)
+            return
+
+        queued_action = _QueuedAction(
+            action=action,
+            name=name,
+            priority=priority,
+            enqueued_at=now,
+            deadline=deadline,
+            key=key,
+            future=future)
+        _queues[priority].append(queued_action)
+        if key is not None:
+            _pending_by_key[key] = queued_action
+        _stats[priority].queued += 1
+        _notify()
+
+
+def enqueue_action(action, priority: ActionPriority = ActionPriority.HOUSEKEEPING, timeout: float = None, name: str = None, key: Hashable = None):
+    ''' Queues the action to be ran on the action thread. Higher priority actions run first,
+        and if a timeout (seconds) is provided the action is dropped if it hasn't started by then.
+        Metrics are recorded under the name, which defaults to the function's name.
+
+        If an action with the same key is still waiting, it is replaced by this action
+        (keeping its place in the queue) rather than both being ran.
+    '''
     if not callable(action):
         print(f'Received an action of type {type(action)}, rather than a function. The action will be ignored.')
         return
 
-    _queue.put(action)
+    _enqueue(action, priority, timeout, name, key)
+
+
+async def run_action(action, priority: ActionPriority = ActionPriority.HOUSEKEEPING, timeout: float = None, name: str = None, key: Hashable = None):
+    ''' Queues the action like enqueue_action, and waits for it to run. Returns what the action
+        returned, or raises asyncio.CancelledError if it was dropped or replaced before running.
+    '''
+    future = Future()
+    _enqueue(action, priority, timeout, name, key, future)
+    return await asyncio.wrap_future(future)
+
+
+def _collect_metrics():
+    with _condition:
+        for priority, queue in _queues.items():
+            _queue_depth.set(len(queue), priority=priority.name.lower())
+
+
+register_collector(_collect_metrics)
+
+
+def get_stats() -> Dict[ActionPriority, ActionClassStats]:
+    with _condition:
+        return { priority: ActionClassStats(**vars(stats)) for priority, stats in _stats.items() }
@@ -1,3 +1,4 @@
+import asyncio
 import time
 import action_queue
 
@@ -9,10 +10,18 @@ from game.logging.entities.log_message import LogMessageType
 from game.buff.buff_manager import BuffManager
 from game.dkp.bidding_manager import BiddingManager
 from integrations.opendkp.opendkp import OpenDkp
-from utils.config import get_config
+from utils.config import get_config, observe_config, start_watching_config
+from utils.pacing import confirm_tell, confirm_tell_not_online, start_confirming_tells
+from utils.metrics import counter, gauge, register_collector, start_metrics_server
 
 TICK_INTERVAL = 1
 
+_observer_lag = gauge('eq_bot_log_observer_lag_seconds', 'Seconds between the last message being read and its observer receiving it', ('observer',))
+_observer_max_lag = gauge('eq_bot_log_observer_max_lag_seconds', 'Most seconds between a message being read and its observer receiving it', ('observer',))
+_observer_queued = gauge('eq_bot_log_observer_queued', 'Messages waiting for an observer', ('observer',))
+_observer_dropped_total = counter('eq_bot_log_observer_dropped_total', 'Messages dropped because an observer was behind', ('observer',))
+_observer_failed_total = counter('eq_bot_log_observer_failed_total', 'Messages which an observer raised an exception for', ('observer',))
+
 class Bot:
     def __init__(self):
         self._window = EverQuestWindow.get_window()
@@ -21,6 +30,35 @@ class Bot:
         self._guild_tracker = GuildTracker(
             self._window,
             self._opendkp)
+        self._buff_message_filter = None
+
+    def _refresh_buff_observation(self, buff_manager: BuffManager):
+        # Most reloads don't touch the buffing spells, leave the observation alone for those
+        message_filter = buff_manager.message_filter
+        if message_filter == self._buff_message_filter:
+            return
+
+        self._buff_message_filter = message_filter
+        self._player_log_reader.set_observation_filter(
+            LogMessageType.TELL_RECEIVE,
+            buff_manager.handle_tell_message,
+            message_filter)
+
+    def _collect_log_reader_metrics(self):
+        # Observers can be added and removed while the bot is running, so every series is replaced
+        observer_stats = self._player_log_reader.get_observer_stats()
+        for metric, get_value in (
+            (_observer_lag, lambda stats: stats.last_lag),
+            (_observer_max_lag, lambda stats: stats.max_lag),
+            (_observer_queued, lambda stats: stats.queued),
+            (_observer_dropped_total, lambda stats: stats.dropped),
+            (_observer_failed_total, lambda stats: stats.failed)):
+            metric.replace_values((get_value(stats), { 'observer': stats.name }) for stats in observer_stats)
+
+    def stop(self):
+        # Record how far the log was read, so that messages sent while the bot is down aren't missed
+        if get_config('log_parsing.enabled', True):
+            self._player_log_reader.save_checkpoint()
 
     def run(self):
         # Configure DKP Bidding Manager
@@ -32,7 +70,8 @@ class Bot:
 
             self._player_log_reader.observe_messages(
                 LogMessageType.TELL_RECEIVE,
-                bidding_manager.handle_tell_message)
+                bidding_manager.handle_tell_message,
+                bidding_manager.message_filter)
 
         # Configure Buffing Manager
         if get_config('buffing.enabled'):
@@ -40,10 +79,38 @@ class Bot:
                 self._window,
                 self._guild_tracker)
 
+            self._buff_message_filter = buff_manager.message_filter
             self._player_log_reader.observe_messages(
                 LogMessageType.TELL_RECEIVE,
-                buff_manager.handle_tell_message)
+                buff_manager.handle_tell_message,
+                self._buff_message_filter)
+
+            # The filter is built from the configured spells, so rebuild it if they change
+            observe_config(lambda: self._refresh_buff_observation(buff_manager))
 
+        if get_config('log_parsing.enabled', True):
+            # Output is paced by how quickly the bot's tells show up in the log
+            self._player_log_reader.observe_messages(
+                LogMessageType.TELL_SEND,
+                confirm_tell)
+            self._player_log_reader.observe_messages(
+                LogMessageType.TELL_NOT_ONLINE,
+                confirm_tell_not_online)
+            start_confirming_tells()
+
+        # Serve metrics about the action queue, log reader and guild tracker for scraping
+        register_collector(self._collect_log_reader_metrics)
+        start_metrics_server()
+
+        # Reload the configuration when it is edited, so that the bot doesn't need to be restarted
+        start_watching_config()
+
+        if get_config('general.runtime', 'threads') == 'asyncio':
+            asyncio.run(self._run_async())
+        else:
+            self._run_threads()
+
+    def _run_threads(self):
         # Starts a thread that continuously monitors the log
         if get_config('log_parsing.enabled', True):
             self._player_log_reader.start()
@@ -51,10 +118,21 @@ class Bot:
         # Start a thread to continuously track guild members
         if get_config('guild_tracking.enabled'):
             self._guild_tracker.start()
-        
+
         # Start the action queue, which will begin processing commands to the window/other services synchronously
         action_queue.start()
 
         # This thread is probably processing the signal handlers, so we need to let it run every so often
         while True:
             time.sleep(TICK_INTERVAL)
+
+    async def _run_async(self):
+        # The log, guild tracking and window actions share one event loop. Window actions
+        # are still ran one at a time by the action queue's driver
+        tasks = [action_queue.run_async()]
+        if get_config('log_parsing.enabled', True):
+            tasks.append(self._player_log_reader.run_async())
+        if get_config('guild_tracking.enabled'):
+            tasks.append(self._guild_tracker.run_async())
+
+        await asyncio.gather(*tasks)
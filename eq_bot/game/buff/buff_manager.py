@@ -1,46 +1,64 @@
 import time
 from game.window import EverQuestWindow
 from game.guild.guild_tracker import GuildTracker
+from game.logging.entities.log_message_filter import LogMessageFilter
 from utils.config import get_config
-from action_queue import enqueue_action
+from action_queue import enqueue_action, ActionPriority
 
+# Read on use, rather than on import, so that changes to the configuration are picked up
 # TODO: Validate configuration
-BUFFING_SPELLS = get_config('buffing.spells')
-RESTRICT_TO_GUILDIES = get_config('buffing.restrict_to_guildies', True)
+def _get_buffing_spells():
+    return get_config('buffing.spells', {})
+
+def _get_request_timeout():
+    # Requests which have waited this long are dropped, the player has likely moved on
+    return get_config('buffing.request_timeout', 300)
 
 class BuffManager:
     def __init__(self, eq_window: EverQuestWindow, guild_tracker: GuildTracker):
         self._eq_window = eq_window
         self._guild_tracker = guild_tracker
 
+    @property
+    def message_filter(self) -> LogMessageFilter:
+        # Only tells which mention a spell can be a buff request
+        return LogMessageFilter(keywords=frozenset(_get_buffing_spells()))
+
     def handle_tell_message(self, tell_message):
-        enqueue_action(lambda: self.handle_tell_message_async(tell_message))
+        enqueue_action(
+            lambda: self.handle_tell_message_async(tell_message),
+            ActionPriority.BUFF,
+            timeout=_get_request_timeout(),
+            name='buff_request',
+            # A player repeating the same request while it is waiting only gets buffed once
+            key=('buff_request', tell_message.from_character.lower(), tell_message.inner_message.lower()))
 
     def handle_tell_message_async(self, tell_message):
         # Do not proceed if restrict to guildies enabled and is not a guild member
-        if RESTRICT_TO_GUILDIES and not self._guild_tracker.is_a_member(tell_message.from_character):
+        if get_config('buffing.restrict_to_guildies', True) and not self._guild_tracker.is_a_member(tell_message.from_character):
             # TODO: Log a warning
             return
 
+        buffing_spells = _get_buffing_spells()
         spells_to_cast = []
 
-        for spell_name in BUFFING_SPELLS:
+        for spell_name in buffing_spells:
             if spell_name.lower() in tell_message.inner_message.lower():
                 spells_to_cast.append(spell_name)
     
         if len(spells_to_cast) == 0:
             return
 
-        self._eq_window.activate()
-        # TODO: Check if player was not found in zone and inform them
-        self._eq_window.target(tell_message.from_character)
-        self._eq_window.send_tell_message(tell_message.from_character, 'Incoming')
-        # TODO: Check if player was too far and inform them
+        with self._eq_window.session():
+            # TODO: Check if player was not found in zone and inform them
+            self._eq_window.target(tell_message.from_character)
+            self._eq_window.send_tell_message(tell_message.from_character, 'Incoming')
+            # TODO: Check if player was too far and inform them
 
-        for spell_name in spells_to_cast:
-            spell_config = BUFFING_SPELLS[spell_name]
-            self._eq_window.cast_spell(tell_message.from_character, spell_name, spell_config['spell_slot'])
-            recast_time = spell_config.get('recast_time', 1)
-            time.sleep(spell_config['cast_time'] + recast_time)
+            for spell_name in spells_to_cast:
+                spell_config = buffing_spells[spell_name]
+                self._eq_window.cast_spell(tell_message.from_character, spell_name, spell_config['spell_slot'])
+                recast_time = spell_config.get('recast_time', 1)
+                time.sleep(spell_config['cast_time'] + recast_time)
 
-        self._eq_window.sit()
+            self._eq_window.sit()
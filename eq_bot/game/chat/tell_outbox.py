@@ -0,0 +1,74 @@
+from collections import OrderedDict
+from threading import Lock, Timer
+from typing import List, NamedTuple
+
+from action_queue import enqueue_action, ActionPriority
+from utils.config import get_config
+from utils.text import pack_messages
+
+MAX_TELL_MESSAGE_LENGTH = 508
+TELL_JOIN_STR = ' | '
+DEFAULT_COALESCE_WINDOW = .5
+
+
+class _BufferedTell(NamedTuple):
+    message: str
+    # Standalone messages are never joined with others, e.g. lines parsed by other tools
+    standalone: bool
+
+
+def _pack_tells(tells: List[_BufferedTell], max_length: int) -> List[str]:
+    messages = []
+    packable = []
+    for tell in tells:
+        if tell.standalone:
+            messages.extend(pack_messages(packable, max_length, TELL_JOIN_STR))
+            messages.append(tell.message)
+            packable = []
+        else:
+            packable.append(tell.message)
+
+    messages.extend(pack_messages(packable, max_length, TELL_JOIN_STR))
+    return messages
+
+
+class TellOutbox:
+    ''' Buffers tells per recipient for a short window, then sends them packed into as
+        few chat messages as the in-game length limit allows, in the order they were queued.
+    '''
+    def __init__(self, eq_window, priority: ActionPriority = ActionPriority.HOUSEKEEPING):
+        self._eq_window = eq_window
+        self._priority = priority
+        self._tells = OrderedDict()
+        self._flush_scheduled = False
+        self._lock = Lock()
+
+    def send_tell(self, to_player: str, message: str, standalone: bool = False):
+        with self._lock:
+            self._tells.setdefault(to_player, []).append(_BufferedTell(message, standalone))
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+
+        # The flush runs on the action thread, so tells queued by the action
+        # currently running there are always sent together
+        window = get_config('general.output.tell_coalesce_window', DEFAULT_COALESCE_WINDOW)
+        if window > 0:
+            timer = Timer(window, lambda: enqueue_action(self.flush, self._priority, name='tell_outbox_flush'))
+            timer.daemon = True
+            timer.start()
+        else:
+            enqueue_action(self.flush, self._priority, name='tell_outbox_flush')
+
+    def flush(self):
+        ''' Sends every buffered tell, must be called from the action thread '''
+        with self._lock:
+            tells = self._tells
+            self._tells = OrderedDict()
+            self._flush_scheduled = False
+
+        with self._eq_window.session():
+            for to_player, buffered_tells in tells.items():
+                max_length = MAX_TELL_MESSAGE_LENGTH - len(f'/tell {to_player} ')
+                for message in _pack_tells(buffered_tells, max_length):
+                    self._eq_window.send_tell_message(to_player, message)
@@ -4,6 +4,9 @@ from game.dkp.entities.bid_message import BidMessage, EnqueueBidItemsMessage, \
     StartRoundMessage, EndRoundMessage, BidOnItemMessage, BeginRaidMessage, \
     BidMessageType
 
+# Every command starts with this prefix
+CMD_PREFIX = '#'
+
 ENQUEUE_ITEMS_CMD = '#enqueue-items'
 START_ROUND_CMD = '#start-round'
 END_ROUND_CMD = '#end-round'
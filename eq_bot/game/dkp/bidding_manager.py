@@ -2,13 +2,13 @@ from dataclasses import dataclass
 from game.window import EverQuestWindow
 from game.guild.guild_tracker import GuildTracker
 from utils.config import get_config
-from game.dkp.bid_message_parser import parse_bid_message
+from game.dkp.bid_message_parser import parse_bid_message, CMD_PREFIX
 from game.dkp.entities.bid_message import BidMessageType
 from game.dkp.bidding_round import BiddingRound
 from integrations.opendkp.opendkp import OpenDkp
-from action_queue import enqueue_action
-
-RESTRICT_TO_GUILDIES = get_config('dkp.bidding.restrict_to_guildies', True)
+from game.logging.entities.log_message_filter import LogMessageFilter
+from game.chat.tell_outbox import TellOutbox
+from action_queue import enqueue_action, ActionPriority
 
 DEFAULT_ROUND_LENGTH = 180
 
@@ -18,13 +18,19 @@ class BiddingManager:
         self._opendkp = opendkp
         self._guild_tracker = guild_tracker
         self._bidding_round = BiddingRound()
+        # Replies are packed together rather than typed out one at a time
+        self._outbox = TellOutbox(eq_window, ActionPriority.BIDDING)
+
+    @property
+    def message_filter(self) -> LogMessageFilter:
+        return LogMessageFilter(inner_prefix=CMD_PREFIX)
     
     def _handle_bid_message(self, bid_message):
         if bid_message.message_type == BidMessageType.ENQUEUE_BID_ITEMS:
             # TODO: Restrict to officers in guild only
             if len(bid_message.items) == 0:
                 print('Received enqueue bid message, but no items were enqueued.')
-                self._eq_window.send_tell_message(
+                self._outbox.send_tell(
                     bid_message.from_player,
                     'You must provide a list of items to enqueue, separated by ";"')
                 return
@@ -37,14 +43,14 @@ class BiddingManager:
             # TODO: Restrict to officers in guild only
             if self._bidding_round.is_enabled():
                 print(f'{bid_message.from_player} attempted to start a round of bidding, but a round is currently active.')
-                self._eq_window.send_tell_message(
+                self._outbox.send_tell(
                     bid_message.from_player,
                     'A round of bidding is already active. You cannot start a new round.')
                 return
 
             if not self._bidding_round.has_items():
                 print(f'{bid_message.from_player} attempted to start a round of bidding, but no items are in the next round.')
-                self._eq_window.send_tell_message(
+                self._outbox.send_tell(
                     bid_message.from_player,
                     'No items are currently queued for bidding. The round has not been started.')
                 return
@@ -52,7 +58,7 @@ class BiddingManager:
             self._bidding_round.start(bid_message.length or DEFAULT_ROUND_LENGTH)
 
             for message in self._bidding_round.build_start_round_messages():
-                self._eq_window.send_tell_message(
+                self._outbox.send_tell(
                     bid_message.from_player,
                     message)
 
@@ -60,13 +66,13 @@ class BiddingManager:
             # TODO: Restrict to officers in guild only
             if not self._bidding_round.is_enabled():
                 print(f'{bid_message.from_player} attempted to end a round of bidding, but a round is not active.')
-                self._eq_window.send_tell_message(
+                self._outbox.send_tell(
                     bid_message.from_player,
                     'There is not a round of bidding currently active.')
                 return
 
             for message in self._bidding_round.build_end_round_messages():
-                self._eq_window.send_tell_message(
+                self._outbox.send_tell(
                     bid_message.from_player,
                     message)
 
@@ -74,14 +80,16 @@ class BiddingManager:
                 # TODO: FEATURE ENHANCEMENT: Commit wins to OpenDKP raid
                 # TODO: FEATURE ENHANCEMENT: Commit alt wins to alt bid tracker
                 for message in bid_result.build_chat_messages():
-                    self._eq_window.send_tell_message(
+                    # Wins are picked up from the log by OpenDKP, so they must be on their own line
+                    self._outbox.send_tell(
                         bid_message.from_player,
-                        message)
+                        message,
+                        standalone=bid_result.winner is not None)
 
         if bid_message.message_type == BidMessageType.BID_ON_ITEM:
             if not self._bidding_round.is_enabled():
                 print(f'{bid_message.from_player} attempted to bid on {bid_message.item} for {bid_message.amount} dkp, but a round is not active.')
-                self._eq_window.send_tell_message(
+                self._outbox.send_tell(
                     bid_message.from_player,
                     'There is not a round of bidding currently active.')
                 return
@@ -96,7 +104,7 @@ class BiddingManager:
                 print(f'{bid_message.from_player} has bid {bid_message.amount} on {bid_message.item}')
             except KeyError:
                 print(f'{bid_message.from_player} tried to bid {bid_message.amount} on {bid_message.item}, but the item is not in the round.')
-                self._eq_window.send_tell_message(
+                self._outbox.send_tell(
                     bid_message.from_player,
                     f'{bid_message.item} is not being bid on. Did you spell the name correctly?')
 
@@ -116,9 +124,20 @@ class BiddingManager:
 
     def handle_tell_message(self, tell_message):
         # Do not proceed if restrict to guildies enabled and is not a guild member
-        if RESTRICT_TO_GUILDIES and not self._guild_tracker.is_a_member(tell_message.from_character):
-            # TODO: Log a warning
-            return
+        if get_config('dkp.bidding.restrict_to_guildies', True):
+            # Tells are handled on the log observer's thread, so it can briefly wait for the first
+            # dump. Without guild tracking no dump will be taken, so there is nothing to wait for
+            roster_timeout = get_config('dkp.bidding.roster_timeout', 5) if get_config('guild_tracking.enabled') else 0
+            if not self._guild_tracker.has_roster(roster_timeout):
+                print(f'{tell_message.from_character} sent a bidding command, but the guild roster has not been loaded yet.')
+                self._outbox.send_tell(
+                    tell_message.from_character,
+                    'The guild roster has not been loaded yet. Please try again shortly.')
+                return
+
+            if not self._guild_tracker.is_a_member(tell_message.from_character):
+                # TODO: Log a warning
+                return
 
         # Should we move this logic upstream and subscribe to bid messages only?
         bid_message = parse_bid_message(tell_message)
@@ -126,4 +145,7 @@ class BiddingManager:
         if not bid_message:
             return
 
-        enqueue_action(lambda: self._handle_bid_message(bid_message))
+        enqueue_action(
+            lambda: self._handle_bid_message(bid_message),
+            ActionPriority.BIDDING,
+            name=f'bid_{bid_message.message_type.name.lower()}')
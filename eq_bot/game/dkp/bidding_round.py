@@ -3,6 +3,7 @@ from typing import List
 from game.dkp.entities.biddable_item import BiddableItem
 from game.dkp.entities.player_bid import PlayerBid
 from game.dkp.entities.bid_result import BidResult
+from utils.text import pack_messages
 
 MAX_GUILD_MESSAGE_LENGTH = 508
 ITEM_JOIN_STR = ' | '
@@ -27,21 +28,10 @@ class BiddingRound:
         return self._enabled
 
     def _build_round_item_message(self, prefix: str) -> List[str]:
-        messages_to_send = []
-        message = f'{prefix}: {self._items[0].print()}'
-
-        for item in self._items[1:]:
-            item_message = item.print()
-            if len(message) + len(item_message) + len(ITEM_JOIN_STR) <= MAX_GUILD_MESSAGE_LENGTH:
-                message += f'{ITEM_JOIN_STR}{item_message}'
-            else:
-                messages_to_send.append(message)
-
-                # start the next message with the current item
-                message = item_message
-        
-        messages_to_send.append(message)
-        return messages_to_send
+        return pack_messages(
+            [f'{prefix}: {self._items[0].print()}', *[item.print() for item in self._items[1:]]],
+            MAX_GUILD_MESSAGE_LENGTH,
+            ITEM_JOIN_STR)
 
     def build_end_round_messages(self) -> List[str]:
         return self._build_round_item_message('BIDDING CLOSED ON')
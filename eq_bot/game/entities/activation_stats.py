@@ -0,0 +1,24 @@
+from dataclasses import dataclass
+
+@dataclass
+class ActivationStats:
+    # Times the window was needed for a chat message
+    requested: int = 0
+    # Times activation was skipped because the window was known or found to be focused
+    skipped: int = 0
+    # Times the window was actually activated
+    activated: int = 0
+    # Times the window had to be searched for, rather than using the cached window
+    searched: int = 0
+    failed: int = 0
+    # Seconds spent on activations which were performed
+    total_time: float = 0.0
+    max_time: float = 0.0
+    last_time: float = 0.0
+
+    @property
+    def average_time(self) -> float:
+        return self.total_time / self.activated if self.activated else 0.0
+
+    def print(self):
+        print({ **vars(self), 'average_time': self.average_time })
@@ -1,26 +1,48 @@
-from datetime import datetime
+import traceback
+
+from typing import List
 
 from game.guild.entities.dkp_summary import DkpSummary
 from game.guild.entities.dkp_summary_differential import DkpSummaryDifferential
+from game.guild.entities.dkp_metric_threshold import DkpMetricThreshold
 
 from utils.config import get_config
 
 
-OFF_DUTY_METRIC_KEY=get_config('guild_tracking.opendkp_metrics.off_duty.key')
-OFF_DUTY_METRIC_THRESHOLD=get_config('guild_tracking.opendkp_metrics.off_duty.threshold')
+def get_metric_thresholds() -> List[DkpMetricThreshold]:
+    ''' Builds the thresholds configured under guild_tracking.opendkp_metrics, e.g.
+        off_duty: { key: calculated_30, threshold: .40 }
+    '''
+    thresholds = []
+    for name, metric in get_config('guild_tracking.opendkp_metrics', {}).items():
+        try:
+            thresholds.append(DkpMetricThreshold(name=name, key=metric['key'], threshold=metric['threshold']))
+        except Exception as e:
+            print(f'Invalid OpenDKP metric {name}, it will be ignored.')
+            traceback.print_exc()
+    return thresholds
+
 
+def build_differential(from_summary: DkpSummary, to_summary: DkpSummary, thresholds: List[DkpMetricThreshold] = None) -> DkpSummaryDifferential:
+    if thresholds is None:
+        thresholds = get_metric_thresholds()
+    crossed_thresholds = { threshold: [] for threshold in thresholds }
 
-def build_differential(from_summary: DkpSummary, to_summary: DkpSummary) -> DkpSummaryDifferential:
-    offduty_members = []
-    current_time = datetime.now()
+    from_members_by_id = {}
+    for member in from_summary.guild_members:
+        if member.character_rank != "INACTIVE":
+            from_members_by_id.setdefault(member.character_id, member)
 
     for member in to_summary.guild_members:
-        from_member = next((x for x in from_summary.guild_members if x.character_id == member.character_id and x.character_rank != "INACTIVE"), None)
-        # If they're below the threshold now, but werent previously
-        if from_member and member.__dict__[OFF_DUTY_METRIC_KEY] < OFF_DUTY_METRIC_THRESHOLD and \
-            not from_member.__dict__[OFF_DUTY_METRIC_KEY] < OFF_DUTY_METRIC_THRESHOLD:
-            offduty_members.append(member)
+        from_member = from_members_by_id.get(member.character_id)
+        if not from_member:
+            continue
+
+        for threshold, members in crossed_thresholds.items():
+            # If they're below the threshold now, but werent previously
+            if threshold.is_below(member) and not threshold.is_below(from_member):
+                members.append(member)
 
     return DkpSummaryDifferential(
-        offduty_members=offduty_members,
+        crossed_thresholds=crossed_thresholds,
         delta_time=to_summary.taken_at - from_summary.taken_at)
@@ -1,6 +1,8 @@
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import Dict, List
 
 from game.guild.entities.guild_dump import GuildDump
+from game.guild.entities.guild_member import GuildMember
 from game.guild.entities.guild_dump_differential import GuildDumpDifferential
 
 from utils.config import get_config
@@ -9,39 +11,61 @@ from utils.config import get_config
 DAYS_UNTIL_INACTIVE=get_config('guild_tracking.in_game_dump.days_until_inactive', 30)
 
 
-def build_differential(from_dump: GuildDump, to_dump: GuildDump) -> GuildDumpDifferential:
+def _index_members(dump: GuildDump) -> Dict[str, GuildMember]:
+    members_by_name = {}
+    for member in dump.members:
+        # Keep the first member with a name, as a linear search would
+        members_by_name.setdefault(member.name, member)
+    return members_by_name
+
+
+def _get_inactive_cutoff(current_time: datetime) -> datetime:
+    # Members last seen on or before the cutoff have been gone more than DAYS_UNTIL_INACTIVE whole days
+    return current_time - timedelta(days=DAYS_UNTIL_INACTIVE + 1)
+
+
+def _diff(from_dump: GuildDump, from_index: Dict[str, GuildMember],
+    to_dump: GuildDump, to_index: Dict[str, GuildMember], inactive_cutoff: datetime) -> GuildDumpDifferential:
     new_members = []
-    left_members = []
     inactive_members = []
     logged_on = []
     logged_off = []
 
-    current_time = datetime.now()
-
     for member in to_dump.members:
-        from_member = next((x for x in from_dump.members if x.name == member.name), None)
+        from_member = from_index.get(member.name)
         if not from_member:
             new_members.append(member)
-        else:
-            if not from_member.is_online and member.is_online:
-                logged_on.append(member)
-            if from_member.is_online and not member.is_online:
-                logged_off.append(member)
-            # Only add to off member list if they weren't off duty in the previous run but are now
-            if (current_time - member.last_seen_on).days > DAYS_UNTIL_INACTIVE and not\
-                (current_time - from_member.last_seen_on).days > DAYS_UNTIL_INACTIVE:
-                inactive_members.append(member)
-
-    
-    for member in from_dump.members:
-        to_member = next((x for x in to_dump.members if x.name == member.name), None)
-        if not to_member:
-            left_members.append(member)
-    
+            continue
+
+        if not from_member.is_online and member.is_online:
+            logged_on.append(member)
+        if from_member.is_online and not member.is_online:
+            logged_off.append(member)
+        # Only add to off member list if they weren't off duty in the previous run but are now
+        if member.last_seen_on <= inactive_cutoff and not from_member.last_seen_on <= inactive_cutoff:
+            inactive_members.append(member)
+
     return GuildDumpDifferential(
         new_members=new_members,
-        left_members=left_members,
+        left_members=[member for member in from_dump.members if member.name not in to_index],
         inactive_members=inactive_members,
         logged_on=logged_on,
         logged_off=logged_off,
         delta_time=to_dump.taken_at - from_dump.taken_at)
+
+
+def build_differential(from_dump: GuildDump, to_dump: GuildDump) -> GuildDumpDifferential:
+    return _diff(
+        from_dump, _index_members(from_dump),
+        to_dump, _index_members(to_dump),
+        _get_inactive_cutoff(datetime.now()))
+
+
+def build_differentials(dumps: List[GuildDump]) -> List[GuildDumpDifferential]:
+    ''' Returns the differential between each consecutive pair of dumps, indexing each dump once '''
+    inactive_cutoff = _get_inactive_cutoff(datetime.now())
+    indexes = [_index_members(dump) for dump in dumps]
+    return [
+        _diff(dumps[i - 1], indexes[i - 1], dumps[i], indexes[i], inactive_cutoff)
+        for i in range(1, len(dumps))
+    ]
@@ -1,6 +1,7 @@
-import csv
+import sys
 
-from typing import List
+from functools import lru_cache
+from typing import Iterator, List
 
 from datetime import datetime
 from dateutil.parser import parse
@@ -8,26 +9,40 @@ from dateutil.parser import parse
 from game.guild.entities.guild_dump import GuildDump
 from game.guild.entities.guild_member import GuildMember
 
+# Column written by /outputfile guild, e.g. 10/17/22
+LAST_SEEN_FORMAT = '%m/%d/%y'
+
+@lru_cache(maxsize=1024)
+def _parse_last_seen(text: str) -> datetime:
+    # A dump only has a handful of distinct dates, so each is only decoded once
+    try:
+        return datetime.strptime(text, LAST_SEEN_FORMAT)
+    except ValueError:
+        return parse(text)
+
 def parse_guild_member(dump_time: datetime, member_arr: List[str]) -> GuildMember:
-    zone = member_arr[6]
+    # Class, rank and zone repeat across most rows, so share a single copy of each
+    zone = sys.intern(member_arr[6])
     return GuildMember(
         name=member_arr[0],
         level=int(member_arr[1]),
-        class_type=member_arr[2],
-        rank=member_arr[3],
+        class_type=sys.intern(member_arr[2]),
+        rank=sys.intern(member_arr[3]),
         is_alt=member_arr[4] == 'A',
-        last_seen_on=parse(member_arr[5]),
+        last_seen_on=_parse_last_seen(member_arr[5]),
         zone=zone,
         public_note=member_arr[7],
         last_seen_by_bot=dump_time,
-        is_online=zone and len(zone) > 0
+        is_online=len(zone) > 0
     )
 
-def parse_dump_file(dump_time: datetime, filepath: str) -> GuildDump:
-    member_entities = []
+def iter_dump_file(dump_time: datetime, filepath: str) -> Iterator[GuildMember]:
+    ''' Parses members one row at a time, without holding the whole dump in memory '''
     with open(filepath, newline='') as guild_dump:
-        members = csv.reader(guild_dump, delimiter='\t')
-        for member in members:
-            member_entities.append(parse_guild_member(dump_time, member))
+        for line in guild_dump:
+            line = line.rstrip('\r\n')
+            if line:
+                yield parse_guild_member(dump_time, line.split('\t'))
 
-    return GuildDump(members=member_entities, taken_at=dump_time)
+def parse_dump_file(dump_time: datetime, filepath: str) -> GuildDump:
+    return GuildDump(members=list(iter_dump_file(dump_time, filepath)), taken_at=dump_time)
@@ -0,0 +1,22 @@
+from dataclasses import dataclass, field
+from operator import attrgetter
+from typing import Callable
+
+from game.guild.entities.guild_member_dkp import GuildMemberDkp
+
+@dataclass(frozen=True)
+class DkpMetricThreshold:
+    ''' A member crosses the threshold when their metric (a GuildMemberDkp field) drops below it '''
+    name: str
+    key: str
+    threshold: float
+    get_value: Callable[[GuildMemberDkp], float] = field(init=False, compare=False, repr=False)
+
+    def __post_init__(self):
+        if self.key not in GuildMemberDkp.__dataclass_fields__:
+            raise ValueError(f'{self.key} is not a DKP metric, expected one of {list(GuildMemberDkp.__dataclass_fields__)}')
+        # Resolved once, rather than looking the key up for every member
+        object.__setattr__(self, 'get_value', attrgetter(self.key))
+
+    def is_below(self, member: GuildMemberDkp) -> bool:
+        return self.get_value(member) < self.threshold
@@ -1,21 +1,30 @@
 from dataclasses import dataclass
 from datetime import timedelta
 
-from typing import List
+from typing import Dict, List
 
+from game.guild.entities.dkp_metric_threshold import DkpMetricThreshold
 from game.guild.entities.guild_member_dkp import GuildMemberDkp
 
+OFF_DUTY_THRESHOLD_NAME = 'off_duty'
+
 @dataclass
 class DkpSummaryDifferential:
-    offduty_members: List[GuildMemberDkp]
+    # Members who dropped below each threshold since the previous summary
+    crossed_thresholds: Dict[DkpMetricThreshold, List[GuildMemberDkp]]
     delta_time: timedelta
 
+    @property
+    def offduty_members(self) -> List[GuildMemberDkp]:
+        return next((members for threshold, members in self.crossed_thresholds.items() if threshold.name == OFF_DUTY_THRESHOLD_NAME), [])
+
     @property
     def has_differences(self):
-        return len(self.offduty_members) > 0
+        return any(len(members) > 0 for members in self.crossed_thresholds.values())
 
     def print(self):
-        print('-------- Off Duty Members --------')
-        for member in self.offduty_members:
-            print (member.__dict__)
-        print('\n')
+        for threshold, members in self.crossed_thresholds.items():
+            print(f'-------- {threshold.name} ({threshold.key} < {threshold.threshold}) --------')
+            for member in members:
+                print (member.__dict__)
+            print('\n')
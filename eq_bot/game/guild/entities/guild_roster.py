@@ -0,0 +1,42 @@
+from dataclasses import dataclass
+from datetime import datetime
+from types import MappingProxyType
+from typing import FrozenSet, List, Mapping, Optional
+
+from game.guild.entities.guild_member import GuildMember
+
+
+def _get_key(name: str) -> str:
+    return name.casefold()
+
+
+@dataclass(frozen=True)
+class GuildRoster:
+    ''' Read only snapshot of a dump's members, looked up by case-insensitive name '''
+    members_by_name: Mapping[str, GuildMember]
+    alt_names: FrozenSet[str]
+    taken_at: datetime
+
+    @staticmethod
+    def from_members(members: List[GuildMember], taken_at: datetime) -> 'GuildRoster':
+        members_by_name = { _get_key(member.name): member for member in members }
+        return GuildRoster(
+            members_by_name=MappingProxyType(members_by_name),
+            alt_names=frozenset(key for key, member in members_by_name.items() if member.is_alt),
+            taken_at=taken_at)
+
+    def __len__(self):
+        return len(self.members_by_name)
+
+    def __contains__(self, name: str) -> bool:
+        return _get_key(name) in self.members_by_name
+
+    def get_member(self, name: str) -> Optional[GuildMember]:
+        return self.members_by_name.get(_get_key(name))
+
+    def get_rank(self, name: str) -> Optional[str]:
+        member = self.get_member(name)
+        return member.rank if member else None
+
+    def is_alt(self, name: str) -> bool:
+        return _get_key(name) in self.alt_names
@@ -1,5 +1,5 @@
 from game.guild.entities.guild_dump_differential import GuildDumpDifferential
-from game.guild.entities.dkp_summary_differential import DkpSummaryDifferential
+from game.guild.entities.dkp_summary_differential import DkpSummaryDifferential, OFF_DUTY_THRESHOLD_NAME
 from game.guild.dump_analyzer import DAYS_UNTIL_INACTIVE
 
 class DiscordStatusReportFormatter:
@@ -40,10 +40,16 @@ class DiscordStatusReportFormatter:
                 discord_message += "```\n"
 
         if dkp_summary_differential:
-            if len(dkp_summary_differential.offduty_members) > 0:
-                discord_message += f"**Off Duty (RA < 40%)**\n"
+            for threshold, members in dkp_summary_differential.crossed_thresholds.items():
+                if len(members) == 0:
+                    continue
+
+                if threshold.name == OFF_DUTY_THRESHOLD_NAME:
+                    discord_message += f"**Off Duty (RA < {threshold.threshold:.0%})**\n"
+                else:
+                    discord_message += f"**{threshold.name.replace('_', ' ').title()} ({threshold.key} < {threshold.threshold})**\n"
                 discord_message += f"```fix\n"
-                for member in dkp_summary_differential.offduty_members:
+                for member in members:
                     discord_message += f"- {member.character_name} - {member.character_class}\n"
                 discord_message += "```\n"
 
@@ -1,10 +1,16 @@
+import asyncio
+import os
 import time
+import traceback
 import random
 from datetime import datetime, timedelta
-from threading import Thread
+from threading import Thread, Event
 from dataclasses import dataclass
+from typing import Iterator, List
 from game.window import EverQuestWindow, EVERQUEST_ROOT_FOLDER
 from game.guild.entities.dkp_summary import DkpSummary
+from game.guild.entities.guild_dump import GuildDump
+from game.guild.entities.guild_roster import GuildRoster
 from game.guild.dump_parser import parse_dump_file
 from game.guild.dump_analyzer import build_differential as build_dump_differential
 from game.guild.dkp_analyzer import build_differential as build_dkp_summary_differential
@@ -13,8 +19,8 @@ from integrations.opendkp.opendkp import OpenDkp
 from integrations.discord import send_message, DiscordWebhookType
 from utils.file import move_file, make_directory, get_files_from_directory, read_json, write_json
 from utils.config import get_config
-from utils.array import contains
-from action_queue import enqueue_action
+from action_queue import enqueue_action, run_action, ActionPriority
+from utils.metrics import histogram
 
 DUMP_EXTENSION='.dump'
 DUMP_OUTPUT_FOLDER='output\\dumps\\guild'
@@ -22,8 +28,13 @@ DUMP_TIME_FORMAT='%Y%m%d-%H%M%S'
 DKP_SUMMARY_OUTPUT_FOLDER='output\\dkp\\summary'
 DKP_SUMMARY_EXTENSION='.json'
 
-INTERVAL=get_config('guild_tracking.interval', 300)
-DISCORD_EVENTS=get_config('guild_tracking.discord_output.events', [])
+DEFAULT_INTERVAL=300
+
+# Read on use, rather than on import, so that changes to the configuration are picked up
+def _get_discord_events():
+    return get_config('guild_tracking.discord_output.events', [])
+
+_step_seconds = histogram('eq_bot_guild_tracker_step_seconds', 'Seconds taken by each step of a guild status update', ('step',))
 
 class GuildTracker(Thread):
     def __init__(self, eq_window: EverQuestWindow, opendkp: OpenDkp, daemon: bool = True):
@@ -32,30 +43,67 @@ class GuildTracker(Thread):
         make_directory(DKP_SUMMARY_OUTPUT_FOLDER)
         self._eq_window = eq_window
         self._opendkp = opendkp
-        self._last_dump = self._lookup_most_recent_dump()
+        self._roster = None
+        self._roster_ready = Event()
+        self._last_dump = None
+        self._set_last_dump(self._lookup_most_recent_dump())
         self._last_dkp_summary = self._lookup_most_recent_dkp_summary()
         self._discord_formatter = DiscordStatusReportFormatter()
 
+    def _set_last_dump(self, dump):
+        self._last_dump = dump
+        if dump:
+            # Replaced rather than updated, so readers on other threads always see a whole roster
+            self._roster = GuildRoster.from_members(dump.members, dump.taken_at)
+            self._roster_ready.set()
+
     def _get_safe_guild_name(self):
         return self._eq_window.player.guild.replace(' ', '-')
 
+    def _get_dump_prefix(self):
+        return f"{self._get_safe_guild_name()}-Dump-"
+
+    def _get_dkp_summary_prefix(self):
+        return f"DKP-Summary-{self._get_safe_guild_name()}-"
+
+    def _get_history_files(self, folder, prefix, extension) -> List[str]:
+        ''' Returns this guild's files in the folder, oldest first. Timestamps in the names
+            are fixed width, so sorting the names sorts them by when they were taken.
+        '''
+        name_length = len(prefix) + len(datetime.now().strftime(DUMP_TIME_FORMAT)) + len(extension)
+        return sorted(
+            filename for filename in get_files_from_directory(folder, extension)
+            if filename.startswith(prefix) and len(filename) == name_length)
+
+    def _load_dump(self, dump_file):
+        dump_time = datetime.strptime(dump_file, f"{self._get_dump_prefix()}{DUMP_TIME_FORMAT}{DUMP_EXTENSION}")
+        return parse_dump_file(dump_time, os.path.join(DUMP_OUTPUT_FOLDER, dump_file))
+
+    def _load_dkp_summary(self, dkp_summary_file):
+        return DkpSummary.from_json(read_json(os.path.join(DKP_SUMMARY_OUTPUT_FOLDER, dkp_summary_file)))
+
     def _lookup_most_recent_dump(self):
-        previous_dump_files = get_files_from_directory(DUMP_OUTPUT_FOLDER, DUMP_EXTENSION)
-        previous_dumps = []
-        for dump_file in previous_dump_files:
-            dump_time = datetime.strptime(dump_file, f"{self._get_safe_guild_name()}-Dump-{DUMP_TIME_FORMAT}{DUMP_EXTENSION}")
-            previous_dumps.append(parse_dump_file(dump_time, f"{DUMP_OUTPUT_FOLDER}\{dump_file}"))
-        previous_dumps.sort(key=lambda x: x.taken_at, reverse=True)
-        return None if not previous_dumps else previous_dumps[0]
+        # Only the newest dump is parsed, the rest of the history is loaded on demand
+        dump_files = self._get_history_files(DUMP_OUTPUT_FOLDER, self._get_dump_prefix(), DUMP_EXTENSION)
+        return self._load_dump(dump_files[-1]) if dump_files else None
 
     def _lookup_most_recent_dkp_summary(self):
-        previous_dkp_summary_files = get_files_from_directory(DKP_SUMMARY_OUTPUT_FOLDER, DKP_SUMMARY_EXTENSION)
-        previous_dkp_summaries = []
-        for dkp_summary_file in previous_dkp_summary_files:
-            taken_at = datetime.strptime(dkp_summary_file, f"DKP-Summary-{self._get_safe_guild_name()}-{DUMP_TIME_FORMAT}{DKP_SUMMARY_EXTENSION}")
-            previous_dkp_summaries.append(DkpSummary.from_json(read_json(f"{DKP_SUMMARY_OUTPUT_FOLDER}\{dkp_summary_file}")))
-        previous_dkp_summaries.sort(key=lambda x: x.taken_at, reverse=True)
-        return None if not previous_dkp_summaries else previous_dkp_summaries[0]
+        dkp_summary_files = self._get_history_files(DKP_SUMMARY_OUTPUT_FOLDER, self._get_dkp_summary_prefix(), DKP_SUMMARY_EXTENSION)
+        return self._load_dkp_summary(dkp_summary_files[-1]) if dkp_summary_files else None
+
+    def load_dump_history(self, since: datetime = None) -> Iterator[GuildDump]:
+        ''' Parses previous dumps one at a time, oldest first, optionally only those taken since a time '''
+        for dump_file in self._get_history_files(DUMP_OUTPUT_FOLDER, self._get_dump_prefix(), DUMP_EXTENSION):
+            if since and dump_file < f"{self._get_dump_prefix()}{since.strftime(DUMP_TIME_FORMAT)}":
+                continue
+            yield self._load_dump(dump_file)
+
+    def load_dkp_summary_history(self, since: datetime = None) -> Iterator[DkpSummary]:
+        ''' Loads previous DKP summaries one at a time, oldest first, optionally only those taken since a time '''
+        for dkp_summary_file in self._get_history_files(DKP_SUMMARY_OUTPUT_FOLDER, self._get_dkp_summary_prefix(), DKP_SUMMARY_EXTENSION):
+            if since and dkp_summary_file < f"{self._get_dkp_summary_prefix()}{since.strftime(DUMP_TIME_FORMAT)}":
+                continue
+            yield self._load_dkp_summary(dkp_summary_file)
 
     def _create_dkp_summary(self):
         dkp_summary_time = datetime.now()
@@ -90,7 +138,7 @@ class GuildTracker(Thread):
             dump_differential = build_dump_differential(self._last_dump, new_dump)
             dump_differential.print()
 
-        self._last_dump = new_dump
+        self._set_last_dump(new_dump)
 
         # Backup file in local output for future parsing
         move_file(dump_filepath, f"{DUMP_OUTPUT_FOLDER}\{dump_filename}{DUMP_EXTENSION}")
@@ -100,8 +148,42 @@ class GuildTracker(Thread):
     # Run this as a daemon so the thread will be cleaned up if the process is destroyed
     def run(self) -> None:
         while True:
-            enqueue_action(self.update_status)
-            time.sleep(INTERVAL)
+            # Read every iteration so that the interval can be changed while running
+            interval = get_config('guild_tracking.interval', DEFAULT_INTERVAL)
+            # Once the next update is due, this one is no longer worth running
+            # If the previous update is still waiting, it is replaced rather than ran back to back with this one
+            enqueue_action(self.update_status, ActionPriority.HOUSEKEEPING, timeout=interval, name='guild_status', key='guild_status')
+            time.sleep(interval)
+
+    async def run_async(self) -> None:
+        ''' Tracks the guild as a coroutine, for when the bot runs on an event loop rather than threads '''
+        while True:
+            interval = get_config('guild_tracking.interval', DEFAULT_INTERVAL)
+            try:
+                await self.update_status_async(interval)
+            except asyncio.CancelledError:
+                print('Skipped a guild status update which did not run before the next one was due.')
+            except Exception as e:
+                print(f'Error occurred while updating guild status.')
+                traceback.print_exc()
+            await asyncio.sleep(interval)
+
+    def _timed(self, step, fn, *args):
+        start = time.monotonic()
+        result = fn(*args)
+        _step_seconds.observe(time.monotonic() - start, step=step)
+        return result
+
+    def _send_status_report(self, dump_differential, dkp_summary_differential):
+        # TODO: Leverage "guild_tracking.track_events" array to
+        # determine exactly what should be tracked/sent to discord.
+        if len(_get_discord_events()) > 0:
+            message = self._discord_formatter.build_output(
+                dump_differential,
+                dkp_summary_differential)
+
+            if message:
+                self._timed('discord', send_message, DiscordWebhookType.GUILD_STATUS, message)
 
     def update_status(self):
         dump_differential = None
@@ -109,26 +191,47 @@ class GuildTracker(Thread):
 
         # Always take a dump of guild members so that
         # other services can fetch the current roster
-        dump_differential = self._create_dump()
+        dump_differential = self._timed('dump', self._create_dump)
 
-        if 'OPENDKP_OFF_DUTY' in DISCORD_EVENTS:
-            dkp_summary_differential = self._create_dkp_summary()
+        if 'OPENDKP_OFF_DUTY' in _get_discord_events():
+            dkp_summary_differential = self._timed('dkp_summary', self._create_dkp_summary)
 
-        # TODO: Leverage "guild_tracking.track_events" array to
-        # determine exactly what should be tracked/sent to discord.
-        if len(DISCORD_EVENTS) > 0:
-            message = self._discord_formatter.build_output(
-                dump_differential,
-                dkp_summary_differential)
+        self._send_status_report(dump_differential, dkp_summary_differential)
 
-            if message:
-                send_message(
-                    DiscordWebhookType.GUILD_STATUS,
-                    message)
+    async def update_status_async(self, timeout: float = None):
+        ''' Same as update_status, but only the dump uses the window. OpenDKP and Discord
+            requests run in the background, so they don't hold up other actions.
+        '''
+        dump_differential = await run_action(
+            lambda: self._timed('dump', self._create_dump),
+            ActionPriority.HOUSEKEEPING,
+            timeout=timeout,
+            name='guild_dump')
 
-    def is_a_member(self, name):
-        if not self._last_dump:
+        loop = asyncio.get_running_loop()
+        dkp_summary_differential = None
+        if 'OPENDKP_OFF_DUTY' in _get_discord_events():
+            dkp_summary_differential = await loop.run_in_executor(None, self._timed, 'dkp_summary', self._create_dkp_summary)
+
+        await loop.run_in_executor(None, self._send_status_report, dump_differential, dkp_summary_differential)
+
+    def get_roster(self, timeout: float = 0) -> GuildRoster:
+        ''' Returns the members from the last dump, waiting up to timeout seconds (or forever if None)
+            for the first dump to be taken. Don't wait from the action thread, which takes the dump.
+        '''
+        if timeout != 0:
+            self._roster_ready.wait(timeout)
+
+        roster = self._roster
+        if roster is None:
             raise ValueError("Last dump has not yet been taken.")
-        
-        # TODO: Change self.members structure so that we can more easily lookup by name..
-        return contains(self._last_dump.members, lambda member: member.name.lower() == name.lower())
+        return roster
+
+    def has_roster(self, timeout: float = 0) -> bool:
+        ''' Whether a dump has been taken, waiting up to timeout seconds for the first one '''
+        if timeout != 0:
+            self._roster_ready.wait(timeout)
+        return self._roster is not None
+
+    def is_a_member(self, name, timeout: float = 0):
+        return name in self.get_roster(timeout)
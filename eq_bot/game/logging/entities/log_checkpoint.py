@@ -0,0 +1,28 @@
+from dateutil.parser import parse
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+@dataclass
+class LogCheckpoint:
+    device: int
+    inode: int
+    size: int
+    offset: int
+    # Time of the newest message read before the offset, if any
+    last_timestamp: Optional[datetime]
+    saved_at: datetime
+
+    def to_json(self):
+        return vars(self)
+
+    @staticmethod
+    def from_json(json):
+        return LogCheckpoint(
+            device=json["device"],
+            inode=json["inode"],
+            size=json["size"],
+            offset=json["offset"],
+            last_timestamp=parse(json["last_timestamp"]) if json.get("last_timestamp") else None,
+            saved_at=parse(json["saved_at"]))
@@ -1,9 +1,12 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from datetime import datetime
+from typing import Callable, NamedTuple, Optional, Pattern, Tuple
 
 from enum import Enum
 
+from utils.time import parse_log_timestamp
+
 class LogMessageType(Enum):
     UNKNOWN = 'Unknown'
     TELL_RECEIVE = 'Receive Tell'
@@ -16,6 +19,7 @@ class LogMessageType(Enum):
     GROUP = 'Group'
     SHOUT = 'Shout'
     GUILD_STAT = 'Guild Stat'
+    TELL_NOT_ONLINE = 'Tell Not Online'
 
 @dataclass
 class LogMessage:
@@ -28,3 +32,82 @@ class LogMessage:
 
     def print(self):
         print(vars(self))
+
+class LogMessageFieldDecoder(NamedTuple):
+    ''' Extracts the sender, recipient and inner message of a single type of message '''
+    regex: Pattern
+    format_recipient: Optional[Callable[[str], str]]
+
+    def decode(self, full_message: str) -> Tuple[str, str, str]:
+        match = self.regex.match(full_message)
+        if not match:
+            return None, None, None
+
+        fields = match.groupdict()
+        recipient = fields.get('recipient')
+        if recipient is not None and self.format_recipient:
+            recipient = self.format_recipient(recipient)
+
+        return fields.get('sender'), recipient, fields.get('inner')
+
+LOG_MESSAGE_FIELDS = ('timestamp', 'full_message', 'inner_message', 'from_character', 'to', 'message_type')
+
+class LazyLogMessage:
+    ''' Compact alternative to LogMessage which keeps the raw line and only decodes
+        the timestamp and message fields when they are first read.
+    '''
+    __slots__ = ('raw_text', 'message_type', 'player', '_decoder', '_timestamp', '_fields')
+
+    def __init__(self, raw_text: str, message_type: LogMessageType, decoder: LogMessageFieldDecoder = None):
+        self.raw_text = raw_text
+        self.message_type = message_type
+        # The CurrentPlayer whose log the message was read from
+        self.player = None
+        self._decoder = decoder
+        self._timestamp = None
+        self._fields = None
+
+    def _get_fields(self) -> Tuple[str, str, str]:
+        if self._fields is None:
+            self._fields = self._decoder.decode(self.full_message) if self._decoder else (None, None, None)
+        return self._fields
+
+    @property
+    def timestamp(self) -> datetime:
+        if self._timestamp is None:
+            self._timestamp = parse_log_timestamp(self.raw_text[0:26])
+        return self._timestamp
+
+    @property
+    def full_message(self) -> str:
+        return self.raw_text[27:].rstrip('\n')
+
+    @property
+    def from_character(self) -> str:
+        return self._get_fields()[0]
+
+    @property
+    def to(self) -> str:
+        return self._get_fields()[1]
+
+    @property
+    def inner_message(self) -> str:
+        return self._get_fields()[2]
+
+    def to_dict(self) -> dict:
+        return { field: getattr(self, field) for field in LOG_MESSAGE_FIELDS }
+
+    def __eq__(self, other):
+        if not isinstance(other, (LazyLogMessage, LogMessage)):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in LOG_MESSAGE_FIELDS)
+
+    # Mirror the dataclass, which is unhashable since it is mutable and defines __eq__
+    __hash__ = None
+
+    def __repr__(self):
+        fields = ', '.join(f'{field}={getattr(self, field)!r}' for field in LOG_MESSAGE_FIELDS)
+        return f'LogMessage({fields})'
+
+    def print(self):
+        print(self.to_dict())
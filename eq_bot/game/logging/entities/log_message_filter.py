@@ -0,0 +1,41 @@
+import re
+from dataclasses import dataclass
+from typing import Callable, FrozenSet, Optional
+
+@dataclass(frozen=True)
+class LogMessageFilter:
+    ''' Restricts an observation to messages which meet every provided criteria.
+        Senders and keywords are matched case-insensitively, keywords may appear
+        anywhere within the inner message.
+    '''
+    senders: Optional[FrozenSet[str]] = None
+    inner_prefix: Optional[str] = None
+    keywords: Optional[FrozenSet[str]] = None
+
+    def __post_init__(self):
+        if self.senders is not None:
+            object.__setattr__(self, 'senders', frozenset(sender.lower() for sender in self.senders))
+        if self.keywords is not None:
+            object.__setattr__(self, 'keywords', frozenset(keyword.lower() for keyword in self.keywords))
+
+    def compile(self) -> Callable[[object], bool]:
+        ''' Returns a function which tests a log message against this filter '''
+        senders = self.senders
+        inner_prefix = self.inner_prefix
+        keyword_search = None
+        if self.keywords is not None:
+            keyword_search = re.compile(
+                '|'.join(re.escape(keyword) for keyword in self.keywords) or '(?!)',
+                re.IGNORECASE).search
+
+        def matches(message) -> bool:
+            if senders is not None and (message.from_character or '').lower() not in senders:
+                return False
+            inner_message = message.inner_message or ''
+            if inner_prefix is not None and not inner_message.startswith(inner_prefix):
+                return False
+            if keyword_search and not keyword_search(inner_message):
+                return False
+            return True
+
+        return matches
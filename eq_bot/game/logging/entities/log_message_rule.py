@@ -0,0 +1,18 @@
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from game.logging.entities.log_message import LogMessageType
+
+@dataclass(frozen=True)
+class LogMessageRule:
+    ''' Maps a regex to a LogMessageType. The pattern is matched against the
+        message with its timestamp removed and may capture the optional named
+        groups "sender", "recipient" and "inner".
+
+        The keyword is literal text which appears in every line the pattern matches,
+        it allows lines to be cheaply discarded before they are classified.
+    '''
+    message_type: LogMessageType
+    pattern: str
+    format_recipient: Optional[Callable[[str], str]] = None
+    keyword: Optional[str] = None
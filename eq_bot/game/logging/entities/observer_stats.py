@@ -0,0 +1,15 @@
+from dataclasses import dataclass
+
+@dataclass
+class ObserverStats:
+    name: str
+    queued: int
+    delivered: int
+    dropped: int
+    failed: int
+    # Seconds between a message being read and the observer receiving it
+    last_lag: float
+    max_lag: float
+
+    def print(self):
+        print(vars(self))
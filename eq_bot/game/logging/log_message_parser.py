@@ -1,6 +1,8 @@
 import re
-from datetime import datetime
-from game.logging.entities.log_message import LogMessage, LogMessageType
+from typing import Callable, Iterable, List, Optional
+from game.logging.entities.log_message import LogMessage, LazyLogMessage, LogMessageFieldDecoder, LogMessageType
+from game.logging.entities.log_message_rule import LogMessageRule
+from utils.time import parse_log_timestamp
 
 COMMUNICATION_MESSAGES = [
     LogMessageType.AUCTION,
@@ -14,64 +16,124 @@ COMMUNICATION_MESSAGES = [
     LogMessageType.TELL_RECEIVE
 ]
 
-def _parse_timestamp(input):
-    return datetime.strptime(input, "[%a %b %d %H:%M:%S %Y]")
-
-# TODO: Simplify with a regex->LogMessageType map
-def _parse_message_type(full_message, message_split):
-    if message_split[1] == 'tells':
-        # e.g. General:3
-        if len(message_split[2].split(':')) > 1:
-            return LogMessageType.CHANNEL
-        elif message_split[2] == 'you,':
-            return LogMessageType.TELL_RECEIVE
-        elif message_split[2] == 'the':
-            if message_split[3] == 'group,':
-                return LogMessageType.GROUP
-            elif message_split[3] == 'guild,':
-                return LogMessageType.GUILD
-    elif message_split[1] == 'says':
-        if ' '.join(message_split[2:]).startswith('out of character,'):
-            return LogMessageType.OUT_OF_CHARACTER
-    elif message_split[1] == 'auctions,':
-        return LogMessageType.AUCTION
-    elif message_split[1] == 'shouts,':
-        return LogMessageType.SHOUT
-    elif message_split[1] == 'says,':
-        if len(message_split) == 3:
-            return LogMessageType.SAY
-    elif full_message.startswith('You tell'):
-        return LogMessageType.TELL_SEND
-    elif ' '.join(message_split[1:]).startswith('is the rank of'):
-        return LogMessageType.GUILD_STAT
-    return LogMessageType.UNKNOWN
-
-def _parse_message_to(full_message, message_split, message_type):
-    if message_type not in [LogMessageType.CHANNEL, LogMessageType.TELL_RECEIVE, LogMessageType.TELL_SEND]:
-        return
-    
-    if message_type == LogMessageType.CHANNEL:
-        return message_split[2].split(':')[0]
-    elif message_type == LogMessageType.TELL_RECEIVE or message_type == LogMessageType.TELL_SEND:
-        return message_split[2].rstrip(',').capitalize()
-    # TODO: Log warning
-
-def _parse_inner_message(full_message):
-    result = re.search(", '(.*)'$", full_message)
-    if not result or len(result.groups()) == 0:
-        raise ValueError('Failed to parse inner message.')
-    return result.group(1)
+# Rules are evaluated in order, the first one to match determines the message type.
+# To support a new type of message, add a LogMessageType and a rule to this table.
+MESSAGE_RULES: List[LogMessageRule] = [
+    # e.g. Soandso tells General:3, 'Hello'
+    LogMessageRule(LogMessageType.CHANNEL, r"(?P<sender>\S+) tells (?P<recipient>[^\s:]+):\S*, '(?P<inner>.*)'$", keyword=' tells '),
+    LogMessageRule(LogMessageType.TELL_RECEIVE, r"(?P<sender>\S+) tells (?P<recipient>you), '(?P<inner>.*)'$", str.capitalize, keyword=' tells you, '),
+    LogMessageRule(LogMessageType.GROUP, r"(?P<sender>\S+) tells the group, '(?P<inner>.*)'$", keyword=' tells the group, '),
+    LogMessageRule(LogMessageType.GUILD, r"(?P<sender>\S+) tells the guild, '(?P<inner>.*)'$", keyword=' tells the guild, '),
+    LogMessageRule(LogMessageType.OUT_OF_CHARACTER, r"(?P<sender>\S+) says out of character, '(?P<inner>.*)'$", keyword=' says out of character, '),
+    LogMessageRule(LogMessageType.AUCTION, r"(?P<sender>\S+) auctions, '(?P<inner>.*)'$", keyword=' auctions, '),
+    LogMessageRule(LogMessageType.SHOUT, r"(?P<sender>\S+) shouts, '(?P<inner>.*)'$", keyword=' shouts, '),
+    LogMessageRule(LogMessageType.SAY, r"(?P<sender>\S+) says, '(?P<inner>.*)'$", keyword=' says, '),
+    LogMessageRule(LogMessageType.TELL_SEND, r"(?P<sender>You) tell (?P<recipient>\S+?), '(?P<inner>.*)'$", str.capitalize, keyword='You tell '),
+    LogMessageRule(LogMessageType.GUILD_STAT, r"\S+ is the rank of ", keyword=' is the rank of '),
+    # e.g. Soandso is not online at this time. The reply to a tell which couldn't be delivered
+    LogMessageRule(LogMessageType.TELL_NOT_ONLINE, r"(?P<recipient>\S+) is not online at this time\.$", str.capitalize, keyword=' is not online at this time'),
+]
+
+_RULE_FIELDS = ('sender', 'recipient', 'inner')
+_GROUP_NAME_REGEX = re.compile(r"\(\?P([<=])(\w+)")
+
+
+class _LogMessageClassifier:
+    ''' Combines every rule into a single alternation so that a message is
+        classified and its fields are extracted in one regex pass.
+    '''
+    def __init__(self, rules: List[LogMessageRule]):
+        alternatives = []
+        for index, rule in enumerate(rules):
+            # Group names must be unique across the combined pattern, so prefix each with its rule
+            pattern = _GROUP_NAME_REGEX.sub(lambda m: f'(?P{m.group(1)}r{index}_{m.group(2)}', rule.pattern)
+            alternatives.append(f'(?P<r{index}>{pattern})')
+
+        self._regex = re.compile('|'.join(alternatives))
+        # Keyed by the index of each rule's outer group, which is reported by match.lastindex
+        self._rules = {}
+        for index, rule in enumerate(rules):
+            group_indices = tuple(self._regex.groupindex.get(f'r{index}_{field}', 0) for field in _RULE_FIELDS)
+            decoder = LogMessageFieldDecoder(re.compile(rule.pattern), rule.format_recipient)
+            self._rules[self._regex.groupindex[f'r{index}']] = (rule, decoder, *group_indices)
+
+    def match_type(self, full_message: str):
+        ''' Returns a tuple of (message_type, decoder), which can later extract the message's fields '''
+        match = self._regex.match(full_message)
+        if not match:
+            return LogMessageType.UNKNOWN, None
+
+        rule, decoder, *_ = self._rules[match.lastindex]
+        return rule.message_type, decoder
+
+    def classify(self, full_message: str):
+        ''' Returns a tuple of (message_type, sender, recipient, inner_message) '''
+        match = self._regex.match(full_message)
+        if not match:
+            return LogMessageType.UNKNOWN, None, None, None
+
+        rule, _, sender_index, recipient_index, inner_index = self._rules[match.lastindex]
+        sender = match.group(sender_index) if sender_index else None
+        recipient = match.group(recipient_index) if recipient_index else None
+        inner = match.group(inner_index) if inner_index else None
+
+        if recipient is not None and rule.format_recipient:
+            recipient = rule.format_recipient(recipient)
+
+        return rule.message_type, sender, recipient, inner
+
+
+_classifier = _LogMessageClassifier(MESSAGE_RULES)
+
+
+def register_message_rule(rule: LogMessageRule) -> None:
+    ''' Appends a rule to the table, it will be evaluated after all existing rules. '''
+    global _classifier
+    MESSAGE_RULES.append(rule)
+    _classifier = _LogMessageClassifier(MESSAGE_RULES)
+
+
+def build_prefilter(message_types: Iterable[LogMessageType]) -> Optional[Callable[[str], bool]]:
+    ''' Builds a check which returns False for lines that cannot be any of the provided
+        types, or None if every line must be classified (e.g. unknown messages are wanted)
+    '''
+    message_types = set(message_types)
+    if LogMessageType.UNKNOWN in message_types:
+        return None
+
+    keywords = set()
+    for rule in MESSAGE_RULES:
+        if rule.message_type in message_types:
+            if not rule.keyword:
+                return None
+            keywords.add(rule.keyword)
+
+    if not keywords:
+        return lambda line: False
+    if len(keywords) == 1:
+        keyword = keywords.pop()
+        return lambda line: keyword in line
+    return re.compile('|'.join(re.escape(keyword) for keyword in keywords)).search
+
 
 def create_log_message(raw_text):
     full_message = raw_text[27:].rstrip('\n')
-    message_split = full_message.split(' ')
-    message_type = _parse_message_type(full_message, message_split)
-    is_communication_message = message_type in COMMUNICATION_MESSAGES
+    message_type, from_character, to, inner_message = _classifier.classify(full_message)
 
     return LogMessage(
-        timestamp = _parse_timestamp(raw_text[0:26]),
-        from_character = message_split[0] if is_communication_message else None,
-        to = _parse_message_to(full_message, message_split, message_type),
-        inner_message = _parse_inner_message(full_message) if is_communication_message else None,
+        timestamp = parse_log_timestamp(raw_text[0:26]),
+        from_character = from_character,
+        to = to,
+        inner_message = inner_message,
         full_message = full_message,
         message_type = message_type)
+
+
+def create_lazy_log_message(raw_text):
+    ''' Classifies the line without decoding its timestamp or fields, see LazyLogMessage '''
+    # Validate the timestamp's position up front, as decoding it is deferred
+    if len(raw_text) < 27 or raw_text[0] != '[' or raw_text[25] != ']':
+        raise ValueError('Failed to find log message timestamp.')
+
+    message_type, decoder = _classifier.match_type(raw_text[27:].rstrip('\n'))
+    return LazyLogMessage(raw_text, message_type, decoder)
@@ -0,0 +1,104 @@
+import time
+import traceback
+from collections import deque
+from enum import Enum
+from threading import Thread, Condition
+
+from game.logging.entities.observer_stats import ObserverStats
+from utils.config import get_config
+
+
+class OverflowPolicy(Enum):
+    BLOCK = 'block'
+    DROP_OLDEST = 'drop_oldest'
+    DROP_NEWEST = 'drop_newest'
+
+
+DEFAULT_QUEUE_SIZE = get_config('log_parsing.observers.queue_size', 1000)
+DEFAULT_OVERFLOW_POLICY = OverflowPolicy(get_config('log_parsing.observers.overflow_policy', OverflowPolicy.BLOCK.value))
+
+
+class LogObserverWorker(Thread):
+    ''' Delivers messages to a single observer from its own bounded queue, so that
+        a slow or failing observer can't stall the log reader or other observers.
+    '''
+    def __init__(self, callback, queue_size: int = None, overflow_policy: OverflowPolicy = None):
+        super().__init__(daemon=True)
+        self.callback = callback
+        self._queue_size = queue_size or DEFAULT_QUEUE_SIZE
+        self._overflow_policy = overflow_policy or DEFAULT_OVERFLOW_POLICY
+        self._queue = deque()
+        self._condition = Condition()
+        self._stopped = False
+
+        self._delivered = 0
+        self._dropped = 0
+        self._failed = 0
+        self._last_lag = 0.0
+        self._max_lag = 0.0
+
+    @property
+    def observer_name(self) -> str:
+        return getattr(self.callback, '__qualname__', repr(self.callback))
+
+    def dispatch(self, message) -> None:
+        ''' Queues the message for the observer, applying the overflow policy if the queue is full '''
+        with self._condition:
+            if len(self._queue) >= self._queue_size:
+                if self._overflow_policy == OverflowPolicy.DROP_NEWEST:
+                    self._dropped += 1
+                    return
+                if self._overflow_policy == OverflowPolicy.DROP_OLDEST:
+                    self._queue.popleft()
+                    self._dropped += 1
+                else:
+                    while len(self._queue) >= self._queue_size and not self._stopped:
+                        self._condition.wait()
+
+            self._queue.append((time.monotonic(), message))
+            self._condition.notify_all()
+
+    def stop(self) -> None:
+        ''' Stops the worker once messages which have already been queued are delivered '''
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+
+    def get_stats(self) -> ObserverStats:
+        with self._condition:
+            return ObserverStats(
+                name=self.observer_name,
+                queued=len(self._queue),
+                delivered=self._delivered,
+                dropped=self._dropped,
+                failed=self._failed,
+                last_lag=self._last_lag,
+                max_lag=self._max_lag)
+
+    # Run this as a daemon so the thread will be cleaned up if the process is destroyed
+    def run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._queue and not self._stopped:
+                    self._condition.wait()
+                if not self._queue:
+                    return
+                queued_at, message = self._queue.popleft()
+                # Wake the reader if it is blocked on a full queue
+                self._condition.notify_all()
+
+                lag = time.monotonic() - queued_at
+                self._last_lag = lag
+                self._max_lag = max(self._max_lag, lag)
+
+            try:
+                self.callback(message)
+            except Exception:
+                print(f'Error occurred in log observer {self.observer_name}.')
+                traceback.print_exc()
+                with self._condition:
+                    self._failed += 1
+                continue
+
+            with self._condition:
+                self._delivered += 1
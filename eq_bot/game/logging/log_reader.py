@@ -1,36 +1,130 @@
+import asyncio
 import time
-from os.path import exists
-from utils.file import move_file
-from datetime import datetime
+from os.path import exists, join
+from utils.file import move_file, make_directory, read_json, write_json_atomic
+from datetime import datetime, timedelta
 from game.entities.player import CurrentPlayer
+from typing import NamedTuple, Callable, List, Optional
 from game.logging.entities.log_message import LogMessageType
-from game.logging.log_message_parser import create_log_message
+from game.logging.entities.log_message_filter import LogMessageFilter
+from game.logging.log_message_parser import create_lazy_log_message, build_prefilter
+from game.logging.log_tailer import LogTailer
+from game.logging.log_observer_worker import LogObserverWorker, OverflowPolicy
+from game.logging.entities.observer_stats import ObserverStats
+from game.logging.entities.log_checkpoint import LogCheckpoint
 from utils.config import get_config
-from threading import Thread
+from threading import Thread, Event, Lock
 
 PLAYER_LOG_TIMESTAMP_FORMAT='%Y%m%d-%H%M%S'
+CHECKPOINT_OUTPUT_FOLDER=join('output', 'checkpoints', 'logs')
+CHECKPOINT_EXTENSION='.json'
+
+CHECKPOINT_ENABLED=get_config('log_parsing.checkpoint.enabled', True)
+CHECKPOINT_INTERVAL=get_config('log_parsing.checkpoint.interval', 5)
+# Messages older than this many seconds are skipped when resuming from a checkpoint
+MAX_CATCH_UP_SECONDS=get_config('log_parsing.checkpoint.max_catch_up', 300)
+
+
+class LogObservation(NamedTuple):
+    callback: Callable
+    message_filter: Optional[LogMessageFilter]
+    worker: LogObserverWorker
 
-# TODO: Move to configuration file
-MAX_LINES_READ = 100
-TICK_LENGTH = .1
 
 class EverQuestLogReader(Thread):
 
-    def __init__(self, log_folder: str, player: CurrentPlayer, daemon: bool = True):
+    def __init__(self, log_folder: str, player: CurrentPlayer, daemon: bool = True, changed: Event = None,
+        cycle_on_start: bool = None):
         super().__init__(daemon=daemon)
         self.log_folder = log_folder
         self.player = player
         self.observers = {}
-        self._iterator = self._init_iterator()
-        
-        if get_config('log_parsing.cycle_on_start'):
+        self._prefilter = build_prefilter([])
+        self._dispatch_plans = {}
+        self._catch_up_cutoff = None
+        self._last_checkpoint_time = time.monotonic()
+        # Checkpoints may be saved from another thread (e.g. when stopping) while lines are read
+        self._checkpoint_lock = Lock()
+        self._saved_position = None
+        self._last_timestamp = None
+        self._tailer = LogTailer(self.get_player_log(), checkpoint=self._load_checkpoint(), changed=changed)
+
+        # Defaults to the configuration, readers added mid-session shouldn't cycle a log which is in use
+        if cycle_on_start is None:
+            cycle_on_start = get_config('log_parsing.cycle_on_start')
+        if cycle_on_start:
             self.cycle_player_log()
 
     # Run this as a daemon so the thread will be cleaned up if the process is destroyed
     def run(self) -> None:
+        self._tailer.start_watching()
         while True:
-            self.process_new_messages()
-            time.sleep(TICK_LENGTH)
+            self._process_and_checkpoint()
+            self._tailer.wait()
+
+    async def run_async(self) -> None:
+        ''' Tails the log as a coroutine, for when the bot runs on an event loop rather than threads '''
+        loop = asyncio.get_running_loop()
+        self._tailer.start_watching()
+        while True:
+            # Dispatching blocks while an observer's queue is full, and waiting blocks until
+            # notified or the poll interval passes, so keep both off the loop
+            await loop.run_in_executor(None, self._process_and_checkpoint)
+            await loop.run_in_executor(None, self._tailer.wait)
+
+    def _process_and_checkpoint(self):
+        self.process_new_messages()
+        if time.monotonic() - self._last_checkpoint_time >= CHECKPOINT_INTERVAL:
+            self.save_checkpoint()
+
+    @property
+    def tailer(self) -> LogTailer:
+        return self._tailer
+
+    def _get_checkpoint_path(self):
+        return join(CHECKPOINT_OUTPUT_FOLDER, f'{self._get_log_filename()}{CHECKPOINT_EXTENSION}')
+
+    def _load_checkpoint(self):
+        if not CHECKPOINT_ENABLED:
+            return None
+
+        try:
+            checkpoint = LogCheckpoint.from_json(read_json(self._get_checkpoint_path()))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f'Failed to load log checkpoint, reading from the end of the log. Exception: {e}')
+            return None
+
+        # Avoid responding to messages which are too old to still be relevant, or which were
+        # already read before the checkpoint (e.g. if the log was replaced and is read from the start)
+        self._catch_up_cutoff = datetime.now() - timedelta(seconds=MAX_CATCH_UP_SECONDS)
+        self._last_timestamp = checkpoint.last_timestamp
+        if checkpoint.last_timestamp:
+            if checkpoint.last_timestamp < self._catch_up_cutoff:
+                print(f'Log checkpoint is from {checkpoint.last_timestamp}, only catching up on the last {MAX_CATCH_UP_SECONDS} seconds.')
+            self._catch_up_cutoff = max(self._catch_up_cutoff, checkpoint.last_timestamp)
+        return checkpoint
+
+    def save_checkpoint(self):
+        ''' Persists the position of the last processed line, so that the log can be resumed after a restart '''
+        self._last_checkpoint_time = time.monotonic()
+        if not CHECKPOINT_ENABLED:
+            return
+
+        with self._checkpoint_lock:
+            checkpoint = self._tailer.get_checkpoint(self._last_timestamp)
+            if not checkpoint:
+                return
+
+            # Nothing has been read since the last save
+            position = (checkpoint.device, checkpoint.inode, checkpoint.offset)
+            if position == self._saved_position:
+                return
+
+            make_directory(CHECKPOINT_OUTPUT_FOLDER)
+            write_json_atomic(checkpoint.to_json(), self._get_checkpoint_path())
+            self._saved_position = position
 
     def _get_log_filename(self):
         return f'eqlog_{self.player.name}_{self.player.server.lower()}'
@@ -38,51 +132,141 @@ class EverQuestLogReader(Thread):
     def get_player_log(self, filename=None):
         if not filename:
             filename = self._get_log_filename()
-        return f'{self.log_folder}\\{filename}.txt'
+        return join(self.log_folder, f'{filename}.txt')
 
     def cycle_player_log(self):
         current_player_log = self.get_player_log()
         if not exists(current_player_log):
             return
         new_filename = f'{self._get_log_filename()}-{datetime.now().strftime(PLAYER_LOG_TIMESTAMP_FORMAT)}'
+        # Release the log so that it can be moved, the tailer will pick up the new log once it is created
+        self._tailer.close()
         move_file(current_player_log, self.get_player_log(new_filename))
 
-    def _init_iterator(self):
-        current_player_log = self.get_player_log()
-        if not exists(current_player_log):
-            return
-
-        iterator = open(current_player_log, 'r')
-        # Skip to end
-        iterator.seek(0, 2)
-
-        return iterator
-
     def get_observers(self, message_type: LogMessageType):
         if message_type not in self.observers:
             self.observers[message_type] = []
         return self.observers[message_type]
 
-    def observe_messages(self, message_type: LogMessageType, callback):
-        self.get_observers(message_type).append(callback)
+    def _build_dispatch_plan(self, observers):
+        # Each distinct filter is compiled once and shared by every observer using it,
+        # so that it is only evaluated once per message
+        matchers = []
+        matcher_indices = {}
+        plan = []
+        for observation in observers:
+            matcher_index = None
+            if observation.message_filter:
+                if observation.message_filter not in matcher_indices:
+                    matcher_indices[observation.message_filter] = len(matchers)
+                    matchers.append(observation.message_filter.compile())
+                matcher_index = matcher_indices[observation.message_filter]
+            plan.append((matcher_index, observation.worker.dispatch))
+        return matchers, plan
+
+    def _rebuild_dispatch(self):
+        observed = { message_type: observers for message_type, observers in self.observers.items() if observers }
+        # Lines which can't be any of the observed types are discarded before they are parsed
+        self._prefilter = build_prefilter(observed.keys())
+        self._dispatch_plans = {
+            message_type: self._build_dispatch_plan(observers) for message_type, observers in observed.items()
+        }
+
+    def observe_messages(self, message_type: LogMessageType, callback, message_filter: LogMessageFilter = None,
+        queue_size: int = None, overflow_policy: OverflowPolicy = None):
+        ''' Calls the callback with each message of the type, optionally only those which match the filter.
+            The callback runs on its own thread, fed by a queue of up to queue_size messages.
+        '''
+        worker = LogObserverWorker(callback, queue_size, overflow_policy)
+        worker.start()
+        self.add_observation(message_type, LogObservation(callback, message_filter, worker))
+
+    def add_observation(self, message_type: LogMessageType, observation: LogObservation):
+        ''' Adds an observation whose worker has already been started, e.g. one shared with other readers '''
+        self.get_observers(message_type).append(observation)
+        self._rebuild_dispatch()
     
-    def remove_observation(self, message_type: LogMessageType, callback):
-        self.get_observers(message_type).remove(callback)
+    def set_observation_filter(self, message_type: LogMessageType, callback, message_filter: LogMessageFilter = None):
+        ''' Replaces the filter of an observation, keeping its worker so that no messages are missed '''
+        observers = self.get_observers(message_type)
+        index = next((i for i, o in enumerate(observers) if o.callback == callback), None)
+        if index is None:
+            raise ValueError(f'{callback} is not observing {message_type}.')
+        observers[index] = observers[index]._replace(message_filter=message_filter)
+        self._rebuild_dispatch()
+
+    def remove_observation(self, message_type: LogMessageType, callback, stop_worker: bool = True) -> LogObservation:
+        observers = self.get_observers(message_type)
+        observation = next((o for o in observers if o.callback == callback), None)
+        if observation is None:
+            raise ValueError(f'{callback} is not observing {message_type}.')
+        observers.remove(observation)
+        self._rebuild_dispatch()
+        if stop_worker:
+            observation.worker.stop()
+        return observation
+
+    def get_observer_stats(self) -> List[ObserverStats]:
+        return [
+            observation.worker.get_stats()
+            for observers in self.observers.values()
+            for observation in observers
+        ]
 
     def _build_new_messages(self, lines_to_read):
         new_messages = []
-        while len(new_messages) < lines_to_read:
-            next_line = self._iterator.readline()
-            if not next_line:
-                break
+        prefilter = self._prefilter
+        with self._checkpoint_lock:
+            lines = self._tailer.read_lines(lines_to_read)
+
+        for next_line in lines:
+            if prefilter and not prefilter(next_line):
+                continue
             try:
-                new_messages.append(create_log_message(next_line))
+                message = create_lazy_log_message(next_line)
+                message.player = self.player
+                new_messages.append(message)
             except Exception as e:
                 # TODO: Switch to logger.error
                 print(f"Failed to process message: {next_line}. Exception: {e}")
+
+        if new_messages:
+            # Only the newest message's timestamp is decoded, for the checkpoint
+            try:
+                self._last_timestamp = new_messages[-1].timestamp
+            except ValueError:
+                pass
+
+        if self._catch_up_cutoff:
+            new_messages = self._skip_stale_messages(new_messages)
         return new_messages
 
+    def _skip_stale_messages(self, new_messages):
+        # The log is in chronological order, so once a message is recent enough all following messages are too
+        for index, message in enumerate(new_messages):
+            if message.timestamp >= self._catch_up_cutoff:
+                self._catch_up_cutoff = None
+                return new_messages[index:]
+
+        if not self._tailer.has_pending_lines():
+            # Caught up to the end of the log
+            self._catch_up_cutoff = None
+        return []
+
+    # Reads every available line unless lines_to_read is provided
     def process_new_messages(self, lines_to_read=0):
-        for message in self._build_new_messages(lines_to_read if lines_to_read > 0 else MAX_LINES_READ):
-            for observer_fn in self.get_observers(message.message_type):
-                observer_fn(message)
+        dispatch_plans = self._dispatch_plans
+        for message in self._build_new_messages(lines_to_read):
+            if message.message_type not in dispatch_plans:
+                continue
+
+            matchers, plan = dispatch_plans[message.message_type]
+            results = [None] * len(matchers)
+            for matcher_index, dispatch in plan:
+                if matcher_index is not None:
+                    if results[matcher_index] is None:
+                        results[matcher_index] = matchers[matcher_index](message)
+                    if not results[matcher_index]:
+                        continue
+                # Observers are ran by their worker so that the reader only reads and parses
+                dispatch(message)
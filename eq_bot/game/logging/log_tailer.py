@@ -0,0 +1,195 @@
+import os
+import locale
+from collections import deque
+from os.path import basename, dirname
+from threading import Event
+from datetime import datetime
+from typing import Callable, List
+
+try:
+    # Optional, without it the tailer falls back to adaptive polling
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+from game.logging.entities.log_checkpoint import LogCheckpoint
+from utils.config import get_config
+
+MIN_POLL_INTERVAL = get_config('log_parsing.min_poll_interval', .1)
+MAX_POLL_INTERVAL = get_config('log_parsing.max_poll_interval', 1)
+READ_CHUNK_SIZE = 1024 * 1024
+LOG_ENCODING = get_config('log_parsing.encoding', locale.getpreferredencoding(False))
+
+
+class _LogFileEventHandler(FileSystemEventHandler):
+    def __init__(self, matches_filename: Callable[[str], bool], changed: Event):
+        super().__init__()
+        self._matches_filename = matches_filename
+        self._changed = changed
+
+    def on_any_event(self, event):
+        # Moves have a dest_path, which is how a replaced log would arrive
+        paths = [event.src_path, getattr(event, 'dest_path', '')]
+        if any(path and self._matches_filename(basename(path)) for path in paths):
+            self._changed.set()
+
+
+def watch_folder(folder: str, matches_filename: Callable[[str], bool], changed: Event):
+    ''' Sets the event whenever a matching file in the folder changes. Returns
+        the started observer, or None if watchdog isn't installed.
+    '''
+    if not Observer or not os.path.isdir(folder):
+        return None
+
+    observer = Observer()
+    observer.daemon = True
+    observer.schedule(_LogFileEventHandler(matches_filename, changed), folder)
+    observer.start()
+    return observer
+
+
+class LogTailer:
+    ''' Follows a log file, handling truncation, replacement and the file not yet existing.
+
+        Waiting for new data is driven by filesystem notifications when watchdog is
+        installed, otherwise by polling which backs off while the file is idle.
+    '''
+    def __init__(self, path: str, from_end: bool = True, checkpoint: LogCheckpoint = None, changed: Event = None):
+        self.path = path
+        self._file = None
+        self._identity = None
+        self._position = 0
+        self._partial_line = b''
+        self._pending_lines = deque()
+        # May be shared by several tailers which are waited on together
+        self._changed = changed or Event()
+        self._poll_interval = MIN_POLL_INTERVAL
+        self._observer = None
+
+        self._open(from_end, checkpoint)
+
+    def _open(self, from_end: bool, checkpoint: LogCheckpoint = None) -> bool:
+        try:
+            self._file = open(self.path, 'rb')
+        except FileNotFoundError:
+            return False
+
+        stat = os.fstat(self._file.fileno())
+        self._identity = (stat.st_dev, stat.st_ino)
+        self._partial_line = b''
+
+        if checkpoint:
+            if (checkpoint.device, checkpoint.inode) == self._identity and checkpoint.offset <= stat.st_size:
+                # Resume where we left off
+                self._position = self._file.seek(checkpoint.offset)
+            else:
+                # The log was replaced since the checkpoint, so all of it is new
+                self._position = 0
+        else:
+            self._position = self._file.seek(0, os.SEEK_END) if from_end else 0
+        return True
+
+    def close(self) -> None:
+        ''' Releases the file (e.g. so it can be moved), it will be reopened from the start on the next read '''
+        if self._file:
+            self._file.close()
+        self._file = None
+        self._identity = None
+
+    @property
+    def poll_interval(self) -> float:
+        ''' Seconds to wait before checking for new lines, when not notified of changes '''
+        return self._poll_interval
+
+    def start_watching(self) -> None:
+        if self._observer:
+            return
+
+        filename = basename(self.path)
+        self._observer = watch_folder(dirname(self.path) or '.', lambda name: name == filename, self._changed)
+
+    def _read_available(self) -> None:
+        while True:
+            data = self._file.read(READ_CHUNK_SIZE)
+            if not data:
+                return
+            self._position += len(data)
+
+            lines = (self._partial_line + data).split(b'\n')
+            # The last element is either empty or a line which hasn't been completely written yet
+            self._partial_line = lines.pop()
+            # Lines are decoded when returned, so that unread lines can be accounted for in checkpoints
+            self._pending_lines.extend(lines)
+
+    def _check_rotation(self) -> None:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            # Moved or deleted, anything left in the old file was already read
+            self.close()
+            return
+
+        if (stat.st_dev, stat.st_ino) != self._identity:
+            # Replaced by a new file, which is entirely new content
+            self.close()
+            self._open(from_end=False)
+        elif stat.st_size < self._position:
+            # Truncated, start over from the beginning
+            self._file.seek(0)
+            self._position = 0
+            self._partial_line = b''
+
+    def read_lines(self, max_lines: int = 0) -> List[str]:
+        ''' Returns complete lines written since the last read, all of them if max_lines is 0 '''
+        if not self._file:
+            # Anything in a log which appears after we started is new
+            self._open(from_end=False)
+
+        if self._file:
+            self._read_available()
+            self._check_rotation()
+            if self._file:
+                self._read_available()
+
+        if max_lines <= 0 or max_lines >= len(self._pending_lines):
+            raw_lines = list(self._pending_lines)
+            self._pending_lines.clear()
+        else:
+            raw_lines = [self._pending_lines.popleft() for _ in range(max_lines)]
+
+        lines = [line.rstrip(b'\r').decode(LOG_ENCODING, errors='replace') for line in raw_lines]
+
+        self._poll_interval = MIN_POLL_INTERVAL if lines else min(self._poll_interval * 2, MAX_POLL_INTERVAL)
+        return lines
+
+    def has_pending_lines(self) -> bool:
+        return len(self._pending_lines) > 0
+
+    def get_checkpoint(self, last_timestamp: datetime = None) -> LogCheckpoint:
+        ''' Returns the position after the last line returned by read_lines, or None if the log isn't open.
+            The reader provides the newest timestamp it has seen, as lines are parsed after being read.
+        '''
+        if not self._file:
+            return None
+
+        # Don't include lines which have been read from the file, but not returned
+        offset = max(0, self._position - len(self._partial_line) - sum(len(line) + 1 for line in self._pending_lines))
+
+        return LogCheckpoint(
+            device=self._identity[0],
+            inode=self._identity[1],
+            size=os.fstat(self._file.fileno()).st_size,
+            offset=offset,
+            last_timestamp=last_timestamp,
+            saved_at=datetime.now())
+
+    def wait(self) -> None:
+        ''' Blocks until the file may have changed '''
+        if self.has_pending_lines():
+            return
+
+        # Notifications can be missed (e.g. network drives), so still check at the max interval
+        self._changed.wait(MAX_POLL_INTERVAL if self._observer else self.poll_interval)
+        self._changed.clear()
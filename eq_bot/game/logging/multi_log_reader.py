@@ -0,0 +1,158 @@
+import os
+import re
+import time
+from threading import Thread, Event, Lock
+from typing import List, NamedTuple, Optional
+
+from game.entities.player import CurrentPlayer
+from game.logging.entities.log_message import LogMessageType
+from game.logging.entities.log_message_filter import LogMessageFilter
+from game.logging.log_observer_worker import LogObserverWorker, OverflowPolicy
+from game.logging.log_reader import EverQuestLogReader, LogObservation, CHECKPOINT_INTERVAL
+from game.logging.log_tailer import watch_folder, MAX_POLL_INTERVAL
+from utils.config import get_config
+
+# Excludes logs which have been cycled, e.g. eqlog_Soandso_green-20221017-201501.txt
+PLAYER_LOG_REGEX = re.compile(r"^eqlog_([^_]+)_([^_.-]+)\.txt$")
+DISCOVERY_INTERVAL = get_config('log_parsing.discovery_interval', 30)
+
+
+class _CharacterObservation(NamedTuple):
+    message_type: LogMessageType
+    observation: LogObservation
+    # None when observing every character
+    player_name: Optional[str]
+
+
+class MultiEverQuestLogReader(Thread):
+    ''' Tails the logs of several characters from a single thread. Messages are tagged
+        with the CurrentPlayer whose log they came from (message.player), and can be
+        observed for a single character or across all of them.
+    '''
+    def __init__(self, log_folder: str, players: List[CurrentPlayer] = None, watch_all_characters: bool = False, daemon: bool = True):
+        super().__init__(daemon=daemon)
+        self.log_folder = log_folder
+        self._watch_all_characters = watch_all_characters
+        self._readers = {}
+        self._observations = []
+        self._lock = Lock()
+        # Shared by every character's tailer, so that one wait covers all of the logs
+        self._changed = Event()
+
+        for player in players or []:
+            self.add_player(player)
+
+        if watch_all_characters:
+            self.discover_players()
+
+    @staticmethod
+    def _get_key(player_name: str) -> str:
+        return player_name.lower()
+
+    def get_reader(self, player_name: str) -> EverQuestLogReader:
+        return self._readers.get(self._get_key(player_name))
+
+    def get_players(self) -> List[CurrentPlayer]:
+        return [reader.player for reader in self._readers.values()]
+
+    def add_player(self, player: CurrentPlayer, cycle_on_start: bool = None) -> EverQuestLogReader:
+        with self._lock:
+            key = self._get_key(player.name)
+            if key in self._readers:
+                return self._readers[key]
+
+            reader = EverQuestLogReader(self.log_folder, player, changed=self._changed, cycle_on_start=cycle_on_start)
+            for character_observation in self._observations:
+                if character_observation.player_name in (None, key):
+                    reader.add_observation(character_observation.message_type, character_observation.observation)
+
+            self._readers[key] = reader
+            return reader
+
+    def discover_players(self) -> None:
+        ''' Adds a reader for every character log in the log folder which isn't already being read.
+            Their logs are never cycled, as the characters may be playing.
+        '''
+        if not os.path.isdir(self.log_folder):
+            return
+
+        for filename in os.listdir(self.log_folder):
+            search_result = PLAYER_LOG_REGEX.search(filename)
+            if search_result and not self.get_reader(search_result.group(1)):
+                self.add_player(CurrentPlayer(
+                    name=search_result.group(1),
+                    server=search_result.group(2).capitalize(),
+                    guild=None),
+                    cycle_on_start=False)
+
+    def observe_messages(self, message_type: LogMessageType, callback, message_filter: LogMessageFilter = None,
+        player_name: str = None, queue_size: int = None, overflow_policy: OverflowPolicy = None):
+        ''' Observes the messages of a single character, or all characters (including
+            those added later) if no player_name is provided. The callback has a single
+            worker regardless of how many characters it observes.
+        '''
+        worker = LogObserverWorker(callback, queue_size, overflow_policy)
+        worker.start()
+
+        key = self._get_key(player_name) if player_name else None
+        observation = LogObservation(callback, message_filter, worker)
+        with self._lock:
+            self._observations.append(_CharacterObservation(message_type, observation, key))
+            for reader_key, reader in self._readers.items():
+                if key in (None, reader_key):
+                    reader.add_observation(message_type, observation)
+
+    def remove_observation(self, message_type: LogMessageType, callback, player_name: str = None):
+        key = self._get_key(player_name) if player_name else None
+        with self._lock:
+            character_observation = next((
+                o for o in self._observations
+                if o.message_type == message_type and o.observation.callback == callback and o.player_name == key), None)
+            if character_observation is None:
+                raise ValueError(f'{callback} is not observing {message_type}.')
+            self._observations.remove(character_observation)
+
+            for reader_key, reader in self._readers.items():
+                if key in (None, reader_key):
+                    reader.remove_observation(message_type, callback, stop_worker=False)
+
+        character_observation.observation.worker.stop()
+
+    def process_new_messages(self):
+        for reader in list(self._readers.values()):
+            reader.process_new_messages()
+
+    def save_checkpoints(self):
+        for reader in list(self._readers.values()):
+            reader.save_checkpoint()
+
+    def _wait(self, is_watching: bool):
+        tailers = [reader.tailer for reader in self._readers.values()]
+        if any(tailer.has_pending_lines() for tailer in tailers):
+            return
+
+        # Notifications can be missed (e.g. network drives), so still check at the max interval
+        timeout = MAX_POLL_INTERVAL
+        if not is_watching and tailers:
+            timeout = min(tailer.poll_interval for tailer in tailers)
+
+        self._changed.wait(timeout)
+        self._changed.clear()
+
+    # Run this as a daemon so the thread will be cleaned up if the process is destroyed
+    def run(self) -> None:
+        is_watching = watch_folder(self.log_folder, lambda name: name.startswith('eqlog_'), self._changed) is not None
+        last_checkpoint_time = last_discovery_time = time.monotonic()
+
+        while True:
+            self.process_new_messages()
+
+            if self._watch_all_characters and time.monotonic() - last_discovery_time >= DISCOVERY_INTERVAL:
+                last_discovery_time = time.monotonic()
+                self.discover_players()
+
+            if time.monotonic() - last_checkpoint_time >= CHECKPOINT_INTERVAL:
+                last_checkpoint_time = time.monotonic()
+                self.save_checkpoints()
+
+            self._wait(is_watching)
@@ -9,15 +9,21 @@ if platform.system() == 'Windows':
     import win32gui
 
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime
 
 from pynput.keyboard import Key
 from dataclasses import dataclass
 from game.entities.player import CurrentPlayer
+from game.entities.activation_stats import ActivationStats
 
 from game.logging.log_reader import EverQuestLogReader
+from game.logging.multi_log_reader import MultiEverQuestLogReader
 from game.logging.entities.log_message import LogMessageType
 
-from utils.output import send_text, send_multiple_keys, send_key
+from utils.output import send_text, send_multiple_keys, send_key, send_window_keys, send_window_text
+from utils.input import get_last_focus_input_time
+from utils.pacing import expect_tell, tell_sent
 from utils.config import get_config
 from utils.file import get_latest_modified_file
 
@@ -29,6 +35,9 @@ EVERQUEST_LOG_FOLDER = os.path.join(EVERQUEST_ROOT_FOLDER, 'Logs')
 class EverQuestWindow(ABC):
 
     def __init__(self):
+        self._session_depth = 0
+        self._session_activated_at = None
+        self._activation_stats = ActivationStats()
         self.player = CurrentPlayer(
             name=get_config('player.name'),
             server=get_config('player.server'),
@@ -53,21 +62,72 @@ class EverQuestWindow(ABC):
         return window_class(*args, **kwargs)
 
     @abstractmethod
-    def activate(self):
+    def activate(self) -> bool:
+        ''' Brings the window to the foreground, returning False if it already was '''
         pass
 
+    @contextmanager
+    def session(self):
+        ''' Chat messages sent within the session only activate the window once, or again
+            if input which may have moved focus to another window was seen since.
+        '''
+        if self._session_depth == 0:
+            self._session_activated_at = None
+        self._session_depth += 1
+        try:
+            yield self
+        finally:
+            self._session_depth -= 1
+
+    def _ensure_active(self):
+        stats = self._activation_stats
+        stats.requested += 1
+        if self._session_depth > 0 and self._session_activated_at \
+            and get_last_focus_input_time() < self._session_activated_at:
+            stats.skipped += 1
+            return
+
+        start = time.perf_counter()
+        try:
+            activated = self.activate()
+        except Exception:
+            stats.failed += 1
+            raise
+
+        self._session_activated_at = datetime.now()
+        if not activated:
+            stats.skipped += 1
+            return
+
+        elapsed = time.perf_counter() - start
+        stats.activated += 1
+        stats.total_time += elapsed
+        stats.last_time = elapsed
+        stats.max_time = max(stats.max_time, elapsed)
+        if get_config('general.output.print_activation_time', False):
+            print(f'Activating the EverQuest window took {elapsed * 1000:.1f} ms.')
+
+    def get_activation_stats(self) -> ActivationStats:
+        return ActivationStats(**vars(self._activation_stats))
+
     def clear_chat(self):
         send_multiple_keys([Key.shift, Key.delete])
         send_key(Key.enter)
 
     def send_chat_message(self, message):
-        self.activate()
+        self._ensure_active()
         self.clear_chat()
         send_text(message)
         send_key(Key.enter)
     
     def send_tell_message(self, to_player, message):
-        self.send_chat_message(f'/tell {to_player} {message}')
+        # Expected before sending, so that the line can't reach the log first
+        tell = expect_tell(to_player, message)
+        try:
+            self.send_chat_message(f'/tell {to_player} {message}')
+        finally:
+            # It only has until the confirm timeout to show up once it has been sent
+            tell_sent(tell)
 
     def guild_dump(self, outputfile):
         return self.send_chat_message(f"/outputfile guild {outputfile}")
@@ -75,6 +135,10 @@ class EverQuestWindow(ABC):
     def get_player_log_reader(self):
         return EverQuestLogReader(EVERQUEST_LOG_FOLDER, self.player)
 
+    def get_all_characters_log_reader(self):
+        ''' Returns a single reader for the logs of every character in the Logs folder '''
+        return MultiEverQuestLogReader(EVERQUEST_LOG_FOLDER, [self.player], watch_all_characters=True)
+
     def target(self, target):
         self.send_chat_message(f"/target {target}")
 
@@ -85,7 +149,6 @@ class EverQuestWindow(ABC):
         self.send_chat_message("/sit")
 
     def _lookup_current_player(self):
-        self.activate()
         self.send_chat_message("/log on")
         print('Looking up recently modified log file.')
 
@@ -113,8 +176,9 @@ class EverQuestWindow(ABC):
             LogMessageType.GUILD_STAT,
             self._update_current_guild)
 
-        self.send_chat_message(f"/target {self.player.name}")
-        self.send_chat_message(f"/guildstat")
+        with self.session():
+            self.send_chat_message(f"/target {self.player.name}")
+            self.send_chat_message(f"/guildstat")
         log_reader.process_new_messages()
 
         while not self.player.guild:
@@ -135,30 +199,84 @@ class WindowsEverQuestWindow(EverQuestWindow):
     def activate(self):
         win32gui.SetForegroundWindow(self._lookup())
         time.sleep(.5)
+        return True
 
 
 class LinuxEverQuestWindow(EverQuestWindow):
+    ''' Output is either typed into the focused window (foreground), or sent directly
+        to the window as X11 events (x11) so that it never needs to be focused.
+    '''
 
-    def activate(self):
+    def __init__(self, *args, **kwargs):
+        # The window and its desktop are looked up once, and again only if they stop working
+        self._window_id = None
+        self._desktop_id = None
+        super().__init__(*args, **kwargs)
+
+    @staticmethod
+    def _xdotool(*args):
+        p = subprocess.run(["xdotool", *args], capture_output=True)
+        return p.returncode == 0, p.stdout.decode('utf-8').strip()
+
+    def _search(self):
         # Find the EverQuest window. If more than one exists,
         # it'll be the first one returned by xdotool
-        p = subprocess.run([
-            "xdotool", "search",
-            "--limit", "1",
-            "--name", "^EverQuest$",
-        ], capture_output=True)
-        window_id = p.stdout.decode('utf-8').strip()
+        succeeded, window_id = self._xdotool("search", "--limit", "1", "--name", "^EverQuest$")
+        if not succeeded or not window_id:
+            raise ValueError('Failed to find the EverQuest window. Is EverQuest running?')
 
         # If the window is on another desktop, we need to
         # find which desktop, then focus it
-        p = subprocess.run([
-            "xdotool", "get_desktop_for_window",
-            window_id,
-        ], capture_output=True)
-        desktop_id = p.stdout.decode('utf-8').strip()
-        subprocess.run(["xdotool", "set_desktop", desktop_id])
+        _, desktop_id = self._xdotool("get_desktop_for_window", window_id)
+        self._window_id = window_id
+        self._desktop_id = desktop_id
+        self._activation_stats.searched += 1
+
+    def _is_cached_window_valid(self) -> bool:
+        # Window ids can be reused, so make sure it is still the game
+        succeeded, name = self._xdotool("getwindowname", self._window_id)
+        return succeeded and name == 'EverQuest'
+
+    def _focus(self) -> bool:
+        if self._desktop_id:
+            self._xdotool("set_desktop", self._desktop_id)
         # Focus the window and wait until it has focus via --sync
-        subprocess.run(["xdotool", "windowfocus", "--sync", window_id])
+        succeeded, _ = self._xdotool("windowfocus", "--sync", self._window_id)
+        return succeeded
+
+    def activate(self):
+        if self._window_id:
+            _, active_window_id = self._xdotool("getactivewindow")
+            if active_window_id == self._window_id:
+                return False
+
+            if self._is_cached_window_valid() and self._focus():
+                return True
+
+        self._search()
+        if not self._focus():
+            raise ValueError(f'Failed to focus the EverQuest window {self._window_id}.')
+        return True
+
+    def _send_background_chat_message(self, message):
+        send_window_keys(self._window_id, ["shift+Delete", "Return"])
+        send_window_text(self._window_id, message)
+        send_window_keys(self._window_id, ["Return"])
+
+    def send_chat_message(self, message):
+        if get_config('general.output.linux_backend', 'foreground') != 'x11':
+            super().send_chat_message(message)
+            return
+
+        if not self._window_id or not self._is_cached_window_valid():
+            self._search()
+
+        try:
+            self._send_background_chat_message(message)
+        except subprocess.CalledProcessError:
+            print(f'Failed to send a message to the EverQuest window {self._window_id}, searching for it again.')
+            self._search()
+            self._send_background_chat_message(message)
 
 class MacEverQuestWindow(EverQuestWindow):
 
@@ -166,5 +284,5 @@ class MacEverQuestWindow(EverQuestWindow):
         # TODO: Is there a way to bring a window to foreground by name on Mac?
         # for now, just skipping activation.  The bot will work as long as
         # the EQ window remains in the foreground and focused
-        pass
+        return False
 
@@ -8,6 +8,7 @@ from integrations.discord import send_bot_started_message, send_bot_stopped_mess
 from bot import Bot
 
 _crash_notification_sent = False
+_bot = None
 
 
 def on_start():
@@ -17,6 +18,9 @@ def on_start():
 
 
 def on_stop():
+    if _bot:
+        _bot.stop()
+
     print('Bot has been stopped.')
     if get_config('monitoring.notifications.notify_on_stop') and not _crash_notification_sent:
         send_bot_stopped_message()
@@ -35,9 +39,11 @@ def on_crash(e: Exception):
 
 
 def main():
+    global _bot
     try:
         on_start()
-        Bot().run()
+        _bot = Bot()
+        _bot.run()
     except Exception as e:
         on_crash(e)
     finally:
@@ -0,0 +1,113 @@
+import queue
+import time
+from threading import Event, Lock, Thread
+
+try:
+    # Optional, without it text is typed rather than pasted
+    from tkinter import Tk, TclError
+except ImportError:
+    Tk = None
+    TclError = Exception
+
+# How often the clipboard thread answers paste requests while it has nothing to copy
+_PUMP_INTERVAL = .01
+
+
+def copy_to_clipboard_once(text):
+    ''' Copies using a Tk interpreter which is created and destroyed for this copy alone '''
+    # create gui window
+    gui_window = Tk()
+    gui_window.withdraw()
+    gui_window.clipboard_clear()
+    # copy to window's clipboard
+    gui_window.clipboard_append(text)
+    # persist beyond window
+    gui_window.update()
+    # close window
+    gui_window.destroy()
+
+
+class _ClipboardRequest:
+    def __init__(self, text):
+        self.text = text
+        self.error = None
+        self.done = Event()
+
+
+class Clipboard:
+    ''' Owns a single hidden Tk window for the life of the process, rather than one per copy.
+
+        Tk may only be used from the thread which created it, so the window is created and
+        owned by a dedicated clipboard thread which copies are sent to. Between copies the
+        thread keeps answering paste requests, which on X11 are served by the window owning
+        the clipboard.
+    '''
+    def __init__(self):
+        self._requests = queue.Queue()
+        self._thread = None
+        self._thread_lock = Lock()
+        self._closed = False
+
+    def _ensure_started(self):
+        with self._thread_lock:
+            if self._thread is None:
+                self._closed = False
+                self._thread = Thread(target=self._run, name='clipboard', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        try:
+            window = Tk()
+            window.withdraw()
+        except TclError as e:
+            # e.g. there isn't a display for Tk to use, fail this and every later copy
+            window = None
+            error = e
+
+        while True:
+            try:
+                request = self._requests.get(timeout=_PUMP_INTERVAL)
+            except queue.Empty:
+                if self._closed:
+                    break
+                if window is not None:
+                    window.update()
+                continue
+
+            if window is None:
+                request.error = error
+            else:
+                try:
+                    window.clipboard_clear()
+                    window.clipboard_append(request.text)
+                    window.update()
+                except TclError as e:
+                    request.error = e
+            request.done.set()
+
+        if window is not None:
+            window.destroy()
+
+    def copy(self, text):
+        ''' Copies the text on the clipboard thread, raising TclError if Tk failed '''
+        self._ensure_started()
+        request = _ClipboardRequest(text)
+        self._requests.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+
+    def wait(self, seconds):
+        ''' Paste requests are answered by the clipboard thread, so this only needs to sleep '''
+        time.sleep(seconds)
+
+    def close(self):
+        with self._thread_lock:
+            if self._thread is not None:
+                self._closed = True
+                self._thread.join()
+            self._thread = None
+
+
+def is_clipboard_available() -> bool:
+    return Tk is not None
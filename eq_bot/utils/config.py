@@ -1,10 +1,17 @@
-from typing import Any
+import os
+import time
+import traceback
+
+from threading import Thread, Lock
+from types import MappingProxyType
+from typing import Any, Callable
 
 from utils.file import read_yaml
 
 # TODO: Move to configuration file
 SECRETS_PATH="secrets.yaml"
 CONFIG_PATH="config.yaml"
+RELOAD_CHECK_INTERVAL=2
 
 
 def _get_value_or_default(value, default_value):
@@ -13,30 +20,111 @@ def _get_value_or_default(value, default_value):
     return value
 
 
-def _get_from_path(input, path, default_value):
-    if not input:
-        return _get_value_or_default(None, default_value)
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({ key: _freeze(item) for key, item in value.items() })
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _flatten(input, prefix, paths):
+    for key, value in input.items():
+        path = f'{prefix}{key}'
+        paths[path] = _freeze(value)
+        if isinstance(value, dict):
+            _flatten(value, f'{path}.', paths)
+
+
+class _ConfigSnapshot:
+    ''' Immutable, parsed contents of a yaml file keyed by every dotted path within it '''
+    def __init__(self, file_path: str, expect_found: bool):
+        self.modified_at = self._get_modified_at(file_path)
+        self._paths = {}
+        _flatten(read_yaml(file_path, expect_found=expect_found) or {}, '', self._paths)
+
+    @staticmethod
+    def _get_modified_at(file_path: str):
+        try:
+            return os.stat(file_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def is_stale(self, file_path: str) -> bool:
+        return self._get_modified_at(file_path) != self.modified_at
+
+    def get(self, path: str, default_value=None) -> Any:
+        return _get_value_or_default(self._paths.get(path), default_value)
+
+
+_snapshots = {}
+_snapshot_lock = Lock()
+_config_observers = []
+_watcher = None
+
+
+def _get_snapshot(file_path: str, expect_found: bool) -> _ConfigSnapshot:
+    snapshot = _snapshots.get(file_path)
+    if snapshot is None:
+        with _snapshot_lock:
+            snapshot = _snapshots.get(file_path)
+            if snapshot is None:
+                snapshot = _snapshots[file_path] = _ConfigSnapshot(file_path, expect_found)
+    return snapshot
+
+
+def reload_config() -> bool:
+    ''' Swaps in new snapshots of any files which have changed, and notifies observers if one did '''
+    changed = False
+    for file_path, expect_found in ((CONFIG_PATH, True), (SECRETS_PATH, False)):
+        snapshot = _snapshots.get(file_path)
+        if snapshot and snapshot.is_stale(file_path):
+            try:
+                _snapshots[file_path] = _ConfigSnapshot(file_path, expect_found)
+                changed = True
+            except Exception:
+                # Keep the last good snapshot if the file is mid-write or invalid
+                print(f'Failed to reload {file_path}.')
+                traceback.print_exc()
+
+    if changed:
+        print('Configuration has been reloaded.')
+        for callback in list(_config_observers):
+            try:
+                callback()
+            except Exception:
+                traceback.print_exc()
+
+    return changed
+
+
+def observe_config(callback: Callable[[], None]) -> None:
+    ''' Calls the callback after the configuration has been reloaded '''
+    _config_observers.append(callback)
+
+
+def remove_config_observation(callback: Callable[[], None]) -> None:
+    _config_observers.remove(callback)
+
 
-    current_dict = input
-    key_parts = path.split('.')
+def _watch() -> None:
+    while True:
+        time.sleep(RELOAD_CHECK_INTERVAL)
+        reload_config()
 
-    found_parent = False
-    for key in key_parts[:-1]:
-        if key not in current_dict:
-            break
-        current_dict = current_dict[key]
-        found_parent = True
 
-    value = None
-    if found_parent:
-        value = current_dict.get(key_parts[-1])
-    
-    return _get_value_or_default(value, default_value)
+def start_watching_config() -> None:
+    ''' Starts a daemon thread which reloads the configuration when its files change '''
+    global _watcher
+    if _watcher:
+        return
+    _watcher = Thread(target=_watch, daemon=True)
+    _watcher.start()
 
 
 def get_secret(secret_path: str, default_value=None) -> Any:
-    return _get_from_path(read_yaml(SECRETS_PATH, expect_found=False), secret_path, default_value)
+    return _get_snapshot(SECRETS_PATH, expect_found=False).get(secret_path, default_value)
 
 
 def get_config(config_path: str, default_value=None) -> Any:
-    return _get_from_path(read_yaml(CONFIG_PATH), config_path, default_value)
+    return _get_snapshot(CONFIG_PATH, expect_found=True).get(config_path, default_value)
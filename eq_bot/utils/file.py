@@ -54,3 +54,10 @@ def _json_serializer(obj):
 def write_json(input: dict, file_path):
     with open(file_path, 'w') as file:
         file.write(json.dumps(input, default=_json_serializer))
+
+
+def write_json_atomic(input: dict, file_path):
+    # Write to a temporary file first, so that readers never see a partially written file
+    temp_file_path = f'{file_path}.tmp'
+    write_json(input, temp_file_path)
+    os.replace(temp_file_path, file_path)
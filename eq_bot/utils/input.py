@@ -1,4 +1,4 @@
-from pynput.keyboard import Listener as KeyboardListener
+from pynput.keyboard import Key, Listener as KeyboardListener
 from pynput.mouse import Listener as MouseListener
 from datetime import datetime, timedelta
 from utils.config import get_config
@@ -40,12 +40,17 @@ _mouse_listener = MouseListener(
     on_click=_on_click_mouse,
     on_scroll=_on_scroll_mouse)
 
+_listening = False
+
 def observe_input(callback):
-    _keyboard_listener.stop()
-    _mouse_listener.stop()
+    global _listening
+    # Observers are looked up on every event, so the listeners only need starting once.
+    # They are threads, which can't be started again after being stopped
     _input_observers.append(callback)
-    _mouse_listener.start()
-    _keyboard_listener.start()
+    if not _listening:
+        _listening = True
+        _mouse_listener.start()
+        _keyboard_listener.start()
 
 def _set_last_input_time():
     global _last_input_time
@@ -54,6 +59,20 @@ def _set_last_input_time():
 def _update_last_input_time(action, key):
     _set_last_input_time()
 
+# Input which can move focus away from the game. The bot never clicks or presses these keys
+# itself, so unlike other input they can't have come from its own output
+_FOCUS_KEYS = { Key.alt, Key.alt_l, Key.alt_r, Key.alt_gr, Key.cmd, Key.cmd_l, Key.cmd_r }
+_last_focus_input_time = _last_input_time
+
+def _update_last_focus_input_time(action, value):
+    global _last_focus_input_time
+    if action == 'mouse.click' or (action == 'key.press' and value in _FOCUS_KEYS):
+        _last_focus_input_time = datetime.now()
+
+def get_last_focus_input_time():
+    ''' Returns when input which may have changed the focused window was last seen '''
+    return _last_focus_input_time
+
 def get_timedelta_since_input():
     return datetime.now() - _last_input_time
 
@@ -61,3 +80,4 @@ def has_recent_input():
     return get_timedelta_since_input() < _seconds_delay_if_recent_input
 
 observe_input(_update_last_input_time)
+observe_input(_update_last_focus_input_time)
@@ -0,0 +1,173 @@
+import traceback
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread, Lock
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from utils.config import get_config
+
+# A minimal metrics registry, served in the Prometheus text format
+
+DEFAULT_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_metrics = []
+_collectors = []
+_lock = Lock()
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str], values: Tuple, extra: str = '') -> str:
+    labels = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        labels.append(extra)
+    return '{' + ','.join(labels) + '}' if labels else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    metric_type = None
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+
+    def _key(self, labels: Dict) -> Tuple:
+        return tuple(labels.get(name, '') for name in self.label_names)
+
+    def replace_values(self, samples: Iterable[Tuple[float, Dict]]):
+        ''' Replaces every labelled value at once, e.g. with another component's stats, so that
+            a concurrent scrape sees either the old or the new values but never a partial set
+        '''
+        values = { self._key(labels): value for value, labels in samples }
+        with _lock:
+            self._values = values
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.metric_type}']
+        for key, value in sorted(self._values.items()):
+            lines.append(f'{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}')
+        return lines
+
+
+class Counter(_Metric):
+    metric_type = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    metric_type = 'gauge'
+
+    def set(self, value: float, **labels):
+        with _lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    metric_type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str] = (), buckets: Tuple[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with _lock:
+            # Bucket counts are stored per bucket, and accumulated when rendered
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            counts[bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.metric_type}']
+        for key, (counts, total) in sorted(self._values.items()):
+            cumulative = 0
+            for bucket, count in zip(self.buckets, counts):
+                cumulative += count
+                le = f'le="{_format_value(bucket)}"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(total)}')
+            lines.append(f'{self.name}_count{_format_labels(self.label_names, key)} {cumulative}')
+        return lines
+
+
+def _register(metric):
+    with _lock:
+        _metrics.append(metric)
+    return metric
+
+
+def counter(name: str, documentation: str, label_names: Tuple[str] = ()) -> Counter:
+    return _register(Counter(name, documentation, label_names))
+
+
+def gauge(name: str, documentation: str, label_names: Tuple[str] = ()) -> Gauge:
+    return _register(Gauge(name, documentation, label_names))
+
+
+def histogram(name: str, documentation: str, label_names: Tuple[str] = (), buckets: Tuple[float] = DEFAULT_BUCKETS) -> Histogram:
+    return _register(Histogram(name, documentation, label_names, buckets))
+
+
+def register_collector(collector: Callable):
+    ''' The collector is called before every scrape, e.g. to set gauges from another component's stats '''
+    with _lock:
+        _collectors.append(collector)
+
+
+def render_metrics() -> str:
+    for collector in list(_collectors):
+        try:
+            collector()
+        except Exception as e:
+            print(f'Error occurred while collecting metrics.')
+            traceback.print_exc()
+
+    with _lock:
+        lines = [line for metric in _metrics for line in metric.render()]
+    return '\n'.join(lines) + '\n'
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+
+        body = render_metrics().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes would otherwise be printed to the console
+        pass
+
+
+def start_metrics_server():
+    ''' Serves /metrics on monitoring.metrics.host:port, returns the server or None if disabled '''
+    if not get_config('monitoring.metrics.enabled', False):
+        return None
+
+    address = (get_config('monitoring.metrics.host', '127.0.0.1'), get_config('monitoring.metrics.port', 9108))
+    server = ThreadingHTTPServer(address, _MetricsRequestHandler)
+    server.daemon_threads = True
+    Thread(target=server.serve_forever, daemon=True).start()
+    print(f'Serving metrics on http://{address[0]}:{address[1]}/metrics')
+    return server
@@ -1,13 +1,19 @@
-import random
-from tkinter import Tk
+import subprocess
 from time import sleep
 from utils.config import get_config
 from pynput.keyboard import Key, Controller
+from utils.clipboard import Clipboard, TclError, is_clipboard_available
+from utils.pacing import get_delay, acquire_message_slot
 
 MIN_MESSAGE_DELAY = get_config('general.output.min_message_delay', .75)
 MAX_MESSAGE_DELAY = get_config('general.output.max_message_delay', 1)
 MIN_KEY_DELAY = get_config('general.output.min_key_delay', .1)
 MAX_KEY_DELAY = get_config('general.output.max_key_delay', .225)
+# Messages up to this length are typed rather than pasted. Every character costs a keypress
+# delay, so with the default delays pasting is quicker (see benchmarks/clipboard.py)
+MAX_TYPED_MESSAGE_LENGTH = get_config('general.output.max_typed_message_length', 0)
+# Milliseconds between characters typed into a background window
+BACKGROUND_TYPE_DELAY = get_config('general.output.background_type_delay', 12)
 
 # TODO: Send commands to process in background rather than sending keypresses to current screen
 _keyboard = Controller()
@@ -15,32 +21,44 @@ _keyboard = Controller()
 _input_observers = []
 
 def _sleep_message():
-    sleep(random.uniform(MIN_MESSAGE_DELAY, MAX_MESSAGE_DELAY))
+    sleep(get_delay(MIN_MESSAGE_DELAY, MAX_MESSAGE_DELAY))
 
 def _sleep_keypress(modifier = 1.0):
-    sleep(random.uniform(MIN_KEY_DELAY * modifier, MAX_KEY_DELAY * modifier))
-
-def _copy_to_clipboard(text):
-    # create gui window
-    gui_window = Tk()
-    gui_window.withdraw()
-    gui_window.clipboard_clear()
-    # copy to window's clipboard
-    gui_window.clipboard_append(text)
-    # persist beyond window
-    gui_window.update()
-    # close window
-    gui_window.destroy()
+    sleep(get_delay(MIN_KEY_DELAY * modifier, MAX_KEY_DELAY * modifier))
+
+_clipboard = Clipboard()
+
+def _type_text(text):
+    for character in text:
+        _keyboard.type(character)
+        _sleep_keypress(.33)
 
 def send_key(key):
     _keyboard.press(key)
     _keyboard.release(key)
     _sleep_keypress()
 
-def send_text(text):
-    _copy_to_clipboard(text)
+def _paste_text(text):
+    _clipboard.copy(text)
     send_multiple_keys([Key.ctrl_l, 'v'])
-    _sleep_message()
+
+def send_text(text):
+    acquire_message_slot()
+    if len(text) <= MAX_TYPED_MESSAGE_LENGTH or not is_clipboard_available():
+        _type_text(text)
+        _sleep_message()
+        return
+
+    try:
+        _paste_text(text)
+    except TclError:
+        # e.g. there isn't a display for Tk to use
+        print('Failed to copy to the clipboard, typing the message instead.')
+        _type_text(text)
+        _sleep_message()
+        return
+
+    _clipboard.wait(get_delay(MIN_MESSAGE_DELAY, MAX_MESSAGE_DELAY))
 
 def send_multiple_keys(keys):
     for key in keys:
@@ -50,3 +68,21 @@ def send_multiple_keys(keys):
     for key in keys:
         _keyboard.release(key)
         _sleep_keypress(.33)
+
+
+# Background output, which sends X11 events straight to a window so that it doesn't need focus.
+# Keys use xdotool's names, e.g. shift+Delete or Return
+
+def send_window_keys(window_id, keys):
+    subprocess.run(["xdotool", "key", "--window", window_id, *keys], check=True)
+    _sleep_keypress()
+
+def send_window_text(window_id, text):
+    acquire_message_slot()
+    subprocess.run([
+        "xdotool", "type",
+        "--window", window_id,
+        "--delay", str(BACKGROUND_TYPE_DELAY),
+        "--", text,
+    ], check=True)
+    _sleep_message()
@@ -0,0 +1,199 @@
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+from threading import Lock
+from typing import Optional
+
+from utils.config import get_config
+
+# Paces output to how quickly EverQuest is accepting it. Chat lines are limited by a token
+# bucket modelling the client's chat rate limit, and the randomized key and message delays
+# are scaled down while sent tells keep showing up in the log, and back up when they don't.
+
+SCALE_DECREASE = .9
+SCALE_INCREASE = 1.5
+# Tells which must be confirmed in a row before delays are tightened
+CONFIRMS_TO_TIGHTEN = 5
+# Compare the start of messages, as the client may cut off long tells
+MATCH_LENGTH = 40
+
+
+def _get_pacing_config(key, default):
+    return get_config(f'general.output.pacing.{key}', default)
+
+
+def _is_enabled() -> bool:
+    return _get_pacing_config('enabled', True)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def acquire(self) -> float:
+        ''' Blocks until a token is available, returning how many seconds were spent waiting '''
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            # Tokens are reserved up front, so concurrent callers queue behind each other
+            wait = max(0, -self._tokens / self.rate)
+
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+@dataclass
+class PacingStats:
+    # Multiplier applied to the configured key and message delays
+    delay_scale: float = 1.0
+    messages: int = 0
+    # Seconds spent waiting on the chat rate limit
+    throttled_time: float = 0.0
+    tells_confirmed: int = 0
+    tells_dropped: int = 0
+    # Seconds between sending a tell and it appearing in the log
+    last_confirm_latency: float = 0.0
+    max_confirm_latency: float = 0.0
+
+    def print(self):
+        print(vars(self))
+
+
+@dataclass
+class _PendingTell:
+    to_player: str
+    message: str
+    # Set once the tell has been typed, as it may wait behind other actions until then
+    sent_at: Optional[float] = None
+
+
+_bucket = TokenBucket(
+    _get_pacing_config('messages_per_second', 1.5),
+    _get_pacing_config('burst', 3))
+_pending_tells = deque()
+_stats = PacingStats()
+_consecutive_confirms = 0
+# Tells are only tracked once something is confirming them from the log
+_confirming = False
+_lock = Lock()
+
+
+def _scale_delays(factor: float):
+    # Must be called while holding the lock
+    min_scale = _get_pacing_config('min_delay_scale', .5)
+    max_scale = _get_pacing_config('max_delay_scale', 2)
+    _stats.delay_scale = min(max_scale, max(min_scale, _stats.delay_scale * factor))
+
+
+def _expire_pending_tells(now: float):
+    # Must be called while holding the lock
+    global _consecutive_confirms
+    timeout = _get_pacing_config('confirm_timeout', 5)
+    while _pending_tells and _pending_tells[0].sent_at is not None and now - _pending_tells[0].sent_at > timeout:
+        tell = _pending_tells.popleft()
+        _stats.tells_dropped += 1
+        _consecutive_confirms = 0
+        _scale_delays(SCALE_INCREASE)
+        print(f'A tell to {tell.to_player} was not seen in the log, slowing output down. Message: {tell.message}')
+
+
+def get_delay(min_delay: float, max_delay: float) -> float:
+    ''' Returns a random delay between the configured bounds, scaled by how well output is keeping up '''
+    return random.uniform(min_delay, max_delay) * (_stats.delay_scale if _is_enabled() else 1)
+
+
+def acquire_message_slot():
+    ''' Waits until another chat line can be sent without exceeding the chat rate limit '''
+    if not _is_enabled():
+        return
+
+    with _lock:
+        _expire_pending_tells(time.monotonic())
+        _stats.messages += 1
+
+    waited = _bucket.acquire()
+    with _lock:
+        _stats.throttled_time += waited
+
+
+def expect_tell(to_player: str, message: str) -> Optional[_PendingTell]:
+    ''' Records a tell which is about to be sent, to be confirmed by its "You tell" line in the log.
+        Call tell_sent with the result once it has been sent, which starts the confirm timeout.
+    '''
+    if not _is_enabled() or not _confirming:
+        return None
+
+    tell = _PendingTell(to_player.lower(), message[:MATCH_LENGTH])
+    with _lock:
+        _pending_tells.append(tell)
+    return tell
+
+
+def tell_sent(tell: Optional[_PendingTell]):
+    if tell is None:
+        return
+
+    with _lock:
+        tell.sent_at = time.monotonic()
+
+
+def start_confirming_tells():
+    ''' Called once confirm_tell is observing the log, so that sent tells are expected to appear '''
+    global _confirming
+    _confirming = True
+
+
+def _confirm(to_player: str, message: Optional[str]):
+    global _consecutive_confirms
+    now = time.monotonic()
+
+    with _lock:
+        _expire_pending_tells(now)
+        tell = next((
+            t for t in _pending_tells
+            if t.to_player == to_player and (message is None or t.message == message)), None)
+        if not tell:
+            # Sent by the player rather than the bot
+            return
+
+        _pending_tells.remove(tell)
+        # The log can be read before the action which sent the tell has finished
+        latency = now - tell.sent_at if tell.sent_at is not None else 0.0
+        _stats.tells_confirmed += 1
+        _stats.last_confirm_latency = latency
+        _stats.max_confirm_latency = max(_stats.max_confirm_latency, latency)
+
+        _consecutive_confirms += 1
+        if _consecutive_confirms >= CONFIRMS_TO_TIGHTEN:
+            _consecutive_confirms = 0
+            _scale_delays(SCALE_DECREASE)
+
+
+def confirm_tell(tell_message):
+    ''' Observer for TELL_SEND log messages '''
+    _confirm(
+        (tell_message.to or '').lower(),
+        (tell_message.inner_message or '')[:MATCH_LENGTH])
+
+
+def confirm_tell_not_online(not_online_message):
+    ''' Observer for TELL_NOT_ONLINE log messages. The client accepted the tell, it just couldn't
+        be delivered, so it confirms the oldest tell to that player rather than counting as dropped.
+    '''
+    _confirm((not_online_message.to or '').lower(), None)
+
+
+def get_stats() -> PacingStats:
+    with _lock:
+        return PacingStats(**vars(_stats))
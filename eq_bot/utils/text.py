@@ -0,0 +1,21 @@
+from typing import List
+
+def pack_messages(parts: List[str], max_length: int, separator: str) -> List[str]:
+    ''' Joins consecutive parts with the separator into as few messages as possible,
+        without exceeding max_length. A part longer than max_length is left as is.
+    '''
+    messages = []
+    message = None
+
+    for part in parts:
+        if message is None:
+            message = part
+        elif len(message) + len(part) + len(separator) <= max_length:
+            message += f'{separator}{part}'
+        else:
+            messages.append(message)
+            message = part
+
+    if message is not None:
+        messages.append(message)
+    return messages
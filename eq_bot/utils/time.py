@@ -1,6 +1,31 @@
+from functools import lru_cache
 from datetime import datetime, timezone, timedelta
 
 LOCAL_TIMEZONE = datetime.now(timezone(timedelta(0))).astimezone().tzinfo
 
+_MONTHS = {
+    'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6,
+    'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12
+}
+
 def local_datetime():
     return datetime.now(LOCAL_TIMEZONE)
+
+# Log lines share the same timestamp for every message within a second,
+# so a small cache avoids decoding the same value repeatedly
+@lru_cache(maxsize=128)
+def parse_log_timestamp(text: str) -> datetime:
+    ''' Decodes a fixed-format EverQuest log timestamp, e.g. [Mon Oct 17 20:15:01 2022] '''
+    if len(text) != 26 or text[0] != '[' or text[25] != ']':
+        raise ValueError(f'Failed to parse log timestamp: {text}')
+
+    try:
+        return datetime(
+            int(text[21:25]),
+            _MONTHS[text[5:8]],
+            int(text[9:11]),
+            int(text[12:14]),
+            int(text[15:17]),
+            int(text[18:20]))
+    except (KeyError, ValueError):
+        raise ValueError(f'Failed to parse log timestamp: {text}')